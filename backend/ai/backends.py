@@ -0,0 +1,178 @@
+import copy
+import hashlib
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+from typing import Callable, Optional
+
+# Các backend inference cho model vision (chọn theo model trong Settings)
+#   torch: PyTorch eager float32
+#   int8:  dynamic INT8 quantization (CPU)
+#   onnx:  graph ONNX chạy bằng ONNX Runtime CPU
+BACKENDS = ("torch", "int8", "onnx")
+
+Runner = Callable[[torch.Tensor], torch.Tensor]
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend không hợp lệ: {backend} (chọn một trong {BACKENDS})")
+    return backend
+
+def onnx_path(cache_dir: Optional[str], name: str, key: str) -> str:
+    """Đường dẫn file .onnx; key (tên model, weights...) đổi thì export lại"""
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir or ".", "onnx", f"{name}_{digest}.onnx")
+
+def quantize_int8(module: nn.Module, inplace: bool = False) -> nn.Module:
+    """
+    Dynamic INT8 quantization
+    
+    PyTorch chỉ có kernel dynamic quantization cho nn.Linear; Conv2d vẫn
+    chạy float32 (muốn INT8 cho conv cần static quantization + calibration),
+    nên chỉ đáng dùng cho model chủ yếu là Linear (ViT, CLIP).
+    
+    Args:
+        module: Module float32
+        inplace: True = thay Linear ngay trong module (module float không
+            còn dùng nữa, khỏi giữ hai bản trong RAM); False = trả bản copy
+    """
+    if not inplace:
+        module = copy.deepcopy(module)
+    return torch.ao.quantization.quantize_dynamic(
+        module.cpu().eval(), {nn.Linear}, dtype=torch.qint8, inplace=inplace
+    )
+
+def export_onnx(module: nn.Module, example: torch.Tensor, path: str):
+    """Export module(x) -> y ra ONNX với batch size động"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            copy.deepcopy(module).cpu().eval(),
+            (example.cpu(),),
+            tmp_path,
+            input_names=["input"],
+            output_names=["output"],
+            dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=17
+        )
+    os.replace(tmp_path, path)
+
+class QuantizedRunner(nn.Module):
+    """Module INT8 (CPU) trả output về device; là nn.Module để resident_bytes đếm được"""
+    
+    def __init__(self, module: nn.Module, device: torch.device):
+        super().__init__()
+        self.module = module
+        self.device = device
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.module(x.cpu()).to(self.device)
+
+class OnnxRunner:
+    """InferenceSession ONNX Runtime (CPU) cho graph một input, một output"""
+    
+    def __init__(self, path: str, threads: int = 0):
+        """
+        Args:
+            path: File .onnx
+            threads: intra-op threads (0 = mặc định của ONNX Runtime)
+        """
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: x})[0]
+
+def build_runner(
+    module: nn.Module,
+    backend: str,
+    example: torch.Tensor,
+    path: Optional[str] = None,
+    device: Optional[torch.device] = None,
+    inplace: bool = False
+) -> Runner:
+    """
+    Hàm tensor -> tensor chạy module trên backend đã chọn
+    
+    Args:
+        module: nn.Module nhận một tensor (float32)
+        backend: 'torch', 'int8' hoặc 'onnx'
+        example: Input mẫu [1, ...] để export ONNX
+        path: File .onnx (bắt buộc với 'onnx'; export nếu chưa có)
+        device: Device của output (int8/onnx luôn chạy trên CPU)
+        inplace: int8: quantize ngay trong module thay vì giữ thêm bản copy float32
+    
+    Returns:
+        runner(x) -> output trên device, gọi trong torch.no_grad()
+    """
+    check_backend(backend)
+    if backend == "torch":
+        module.eval()
+        return module
+    
+    device = device or torch.device("cpu")
+    if backend == "int8":
+        return QuantizedRunner(quantize_int8(module, inplace=inplace), device)
+    
+    if not os.path.exists(path):
+        export_onnx(module, example, path)
+    runner = OnnxRunner(path)
+    return lambda x: torch.from_numpy(
+        runner(x.detach().cpu().numpy().astype(np.float32))
+    ).to(device)
+
+class ClipImageEncoder(nn.Module):
+    """pixel_values -> image embeddings (chưa normalize), để quantize/export"""
+    
+    def __init__(self, clip_model):
+        super().__init__()
+        self.vision_model = clip_model.vision_model
+        self.visual_projection = clip_model.visual_projection
+    
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.visual_projection(self.vision_model(pixel_values=pixel_values).pooler_output)
+
+class LogitsOnly(nn.Module):
+    """Bọc model transformers: input -> logits (tensor) để quantize/export"""
+    
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.model(pixel_values=pixel_values).logits
+
+def clip_image_runner(
+    clip_model,
+    backend: str,
+    model_name: str,
+    cache_dir: Optional[str] = None,
+    image_size: int = 224
+) -> Optional[Runner]:
+    """
+    Runner cho vision tower của CLIP; None với 'torch' (dùng model gốc)
+    
+    Với int8, vision tower được quantize ngay trong clip_model: ảnh luôn đi
+    qua runner, giữ thêm bản float32 chỉ tốn RAM.
+    """
+    if check_backend(backend) == "torch":
+        return None
+    example = torch.zeros(1, 3, image_size, image_size)
+    return build_runner(
+        ClipImageEncoder(clip_model),
+        backend,
+        example,
+        onnx_path(cache_dir, "clip_vision", model_name),
+        clip_model.device,
+        inplace=True
+    )
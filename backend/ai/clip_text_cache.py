@@ -0,0 +1,109 @@
+import hashlib
+import os
+import tempfile
+import torch
+from typing import Callable, Dict, List, Optional
+
+class ClipTextCache:
+    """
+    Cache text embeddings (đã normalize) của các bộ prompt CLIP cố định
+    
+    Prompt không đổi giữa các ảnh nên chỉ cần encode một lần cho mỗi lần
+    load model. Key gồm tên model + nội dung prompt, nên khi danh sách
+    prompt thay đổi cache cũ tự động không còn được dùng.
+    """
+    
+    def __init__(
+        self,
+        model,
+        processor,
+        model_name: str,
+        device: torch.device,
+        cache_dir: Optional[str] = None,
+        image_encoder: Optional[Callable[[torch.Tensor], torch.Tensor]] = None
+    ):
+        """
+        Args:
+            model: CLIPModel
+            processor: CLIPProcessor
+            model_name: Tên/đường dẫn model (một phần của cache key)
+            device: Device của model
+            cache_dir: Thư mục lưu embeddings ra đĩa (None = chỉ cache trong RAM)
+            image_encoder: pixel_values -> image embeddings (backend int8/onnx,
+                xem ai.backends); None = model.get_image_features
+        """
+        self.model = model
+        self.processor = processor
+        self.model_name = model_name
+        self.device = device
+        self.cache_dir = cache_dir
+        self.image_encoder = image_encoder
+        self._cache: Dict[str, torch.Tensor] = {}
+    
+    def _key(self, prompts: List[str]) -> str:
+        payload = "\n".join([self.model_name] + list(prompts))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    
+    def _path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"clip_text_{key}.pt")
+    
+    def get(self, prompts: List[str]) -> torch.Tensor:
+        """Text embeddings [len(prompts), dim] đã normalize"""
+        key = self._key(prompts)
+        if key in self._cache:
+            return self._cache[key]
+        
+        path = self._path(key)
+        if path and os.path.exists(path):
+            embeds = torch.load(path, map_location=self.device)
+        else:
+            inputs = self.processor(
+                text=list(prompts),
+                return_tensors="pt",
+                padding=True
+            ).to(self.device)
+            with torch.no_grad():
+                embeds = self.model.get_text_features(**inputs)
+            embeds = embeds / embeds.norm(dim=-1, keepdim=True)
+            if path:
+                self._save(embeds, path)
+        
+        self._cache[key] = embeds
+        return embeds
+    
+    def _save(self, embeds: torch.Tensor, path: str):
+        """
+        Ghi atomic: file tạm cùng thư mục rồi os.replace, nên process khác
+        (ingest worker) không bao giờ torch.load phải file đang ghi dở
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save(embeds.cpu(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
+    def encode_images(self, images) -> torch.Tensor:
+        """Image embeddings [n, dim] đã normalize"""
+        pixel_values = self.processor(images=images, return_tensors="pt")["pixel_values"].to(self.device)
+        with torch.no_grad():
+            if self.image_encoder is not None:
+                embeds = self.image_encoder(pixel_values)
+            else:
+                embeds = self.model.get_image_features(pixel_values=pixel_values)
+        return embeds / embeds.norm(dim=-1, keepdim=True)
+    
+    def logits(self, image_embeds: torch.Tensor, prompts: List[str]) -> torch.Tensor:
+        """
+        logits_per_image [n, len(prompts)], giống CLIPModel.forward
+        nhưng dùng text embeddings đã cache
+        """
+        text_embeds = self.get(prompts)
+        with torch.no_grad():
+            logit_scale = self.model.logit_scale.exp()
+            return logit_scale * image_embeds @ text_embeds.t()
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 của nội dung file (key của cache)"""
+    return hashlib.sha256(data).hexdigest()
+
+@contextmanager
+def _file_lock(path: str):
+    """Khóa độc quyền giữa các process (flock, msvcrt trên Windows)"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class EmbeddingStore:
+    """
+    Cache CLIP image embeddings trên đĩa, key = SHA-256 nội dung file
+    
+    Embeddings nằm trong một ma trận float16 memory-mapped
+    (clip_images_{key}.f16, mỗi dòng một ảnh); log append-only .log ghi
+    "sha256 số_dòng" cho mỗi ảnh. Ảnh không đổi nội dung thì không phải
+    chạy lại vision encoder; file bị sửa có hash mới nên tự động được
+    encode lại.
+    
+    Nhiều instance (registry load lại model, nhiều ingest process) dùng
+    chung file an toàn: số dòng được cấp dưới file lock (.lock) sau khi
+    đọc tiếp phần log các process khác vừa ghi, và vector được flush
+    trước khi dòng log tương ứng xuất hiện.
+    """
+    
+    INITIAL_CAPACITY = 1024
+    
+    def __init__(self, cache_dir: str, model_name: str, dim: int):
+        """
+        Args:
+            cache_dir: Thư mục lưu cache (vd: settings.MODELS_DIR)
+            model_name: Tên model (embeddings của model khác nằm ở file khác)
+            dim: Số chiều embedding
+        """
+        key = hashlib.sha256(f"{model_name}:{dim}".encode("utf-8")).hexdigest()[:16]
+        os.makedirs(cache_dir, exist_ok=True)
+        self.matrix_path = os.path.join(cache_dir, f"clip_images_{key}.f16")
+        self.log_path = os.path.join(cache_dir, f"clip_images_{key}.log")
+        self.lock_path = os.path.join(cache_dir, f"clip_images_{key}.lock")
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._rows = 0  # dòng kế tiếp sẽ được cấp (theo log)
+        self._log_offset = 0  # phần log đã đọc
+        self._matrix = None
+        
+        with self._lock, _file_lock(self.lock_path):
+            self._open(self.INITIAL_CAPACITY)
+            self._catch_up()
+    
+    def _open(self, capacity: int):
+        """(Re)map ma trận với ít nhất capacity dòng, mở rộng file nếu cần"""
+        size = capacity * self.dim * 2
+        with open(self.matrix_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+            # Process khác có thể đã mở rộng file
+            size = max(size, f.tell())
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(
+            self.matrix_path, dtype=np.float16, mode="r+", shape=(size // (self.dim * 2), self.dim)
+        )
+    
+    def _catch_up(self):
+        """Đọc các dòng log mới (kể cả của process khác); cần self._lock"""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # dòng đang ghi dở / process chết giữa chừng
+                self._log_offset += len(line)
+                sha, row = line.split()
+                row = int(row)
+                self._ids[sha.decode("ascii")] = row
+                self._rows = max(self._rows, row + 1)
+        if self._rows > self._matrix.shape[0]:
+            self._open(self._rows)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, sha: str) -> bool:
+        return sha in self._ids
+    
+    def refresh(self):
+        """Nhận các embedding process khác vừa thêm"""
+        with self._lock:
+            self._catch_up()
+    
+    def get(self, sha: str) -> Optional[np.ndarray]:
+        """Embedding [dim] (float32) hoặc None nếu chưa có"""
+        row = self._ids.get(sha)
+        if row is None:
+            return None
+        return np.asarray(self._matrix[row], dtype=np.float32)
+    
+    def get_many(self, shas: List[str]) -> np.ndarray:
+        """Embeddings [len(shas), dim] (float32); mọi sha phải đã có trong cache"""
+        rows = [self._ids[sha] for sha in shas]
+        return np.asarray(self._matrix[rows], dtype=np.float32)
+    
+    def put_many(self, shas: List[str], embeds: np.ndarray):
+        """Thêm embeddings [n, dim]; sha đã có (ở bất kỳ process nào) thì bỏ qua"""
+        with self._lock, _file_lock(self.lock_path):
+            self._catch_up()
+            # Bỏ dòng log ghi dở của process đã chết trước khi append
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self._log_offset:
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(self._log_offset)
+            
+            entries = []
+            for sha, vector in zip(shas, embeds):
+                if sha in self._ids:
+                    continue
+                row = self._rows
+                if row >= self._matrix.shape[0]:
+                    self._open(self._matrix.shape[0] * 2)
+                self._matrix[row] = vector
+                self._ids[sha] = row
+                self._rows += 1
+                entries.append(f"{sha} {row}\n")
+            if not entries:
+                return
+            
+            # Vector lên đĩa trước, rồi mới tới dòng log trỏ vào nó
+            self._matrix.flush()
+            data = "".join(entries).encode("ascii")
+            with open(self.log_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_offset += len(data)
+    
+    def put(self, sha: str, embed: np.ndarray):
+        """Thêm một embedding [dim]"""
+        self.put_many([sha], embed[None, :])
@@ -3,7 +3,19 @@ import torch.nn as nn
 from torchvision import models, transforms
 from PIL import Image
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import os
+
+from ai.backends import build_runner, check_backend, onnx_path
+
+@dataclass
+class EmotionResult:
+    """Kết quả nhận diện cảm xúc của một ảnh"""
+    scores: Dict[str, float]
+    emotion: Optional[str]  # None: ảnh không có mặt người (bị pre-filter bỏ qua)
+    confidence: Optional[float]
+    intensity: Optional[float]
 
 class EmotionDetector:
     """
@@ -12,13 +24,41 @@ class EmotionDetector:
     """
     
     EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+    # Không có 'int8': dynamic quantization chỉ đổi lớp fc của ResNet50,
+    # các lớp conv vẫn float32 (không nhanh hơn mà giữ thêm một bản copy)
+    BACKENDS = ('torch', 'onnx')
     
-    def __init__(self, model_path: str = None, device: str = 'cuda'):
+    def __init__(
+        self,
+        model_path: str = None,
+        device: str = 'cuda',
+        batch_size: int = 32,
+        backend: str = 'torch',
+        cache_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            model_path: Weights đã fine-tune (None = chưa train)
+            device: 'cuda' hoặc 'cpu'
+            batch_size: Số ảnh mỗi forward trong detect_batch()
+            backend: 'torch' hoặc 'onnx' (xem ai.backends)
+            cache_dir: Thư mục lưu graph ONNX (vd: settings.MODELS_DIR)
+        """
+        self.batch_size = max(1, batch_size)
         self.device = torch.device(device if torch.cuda.is_available() else 'cpu')
+        self.backend = check_backend(backend)
+        if self.backend not in self.BACKENDS:
+            raise ValueError(
+                f"EmotionDetector (ResNet50) không hỗ trợ backend {backend!r}, chọn một trong {self.BACKENDS}"
+            )
+        self.cache_dir = cache_dir
         self.model = self._build_model()
+        self._weights_key = "resnet50-untrained"
         
         if model_path:
             self.load_weights(model_path)
+        else:
+            self._build_runner()
         
         self.transform = transforms.Compose([
             transforms.Resize((224, 224)),
@@ -33,12 +73,54 @@ class EmotionDetector:
         model = models.resnet50(weights=None)
         num_features = model.fc.in_features
         model.fc = nn.Linear(num_features, len(self.EMOTIONS))
+        # eval: BatchNorm dùng running stats, kết quả batch == từng ảnh
+        model.eval()
         return model.to(self.device)
     
     def load_weights(self, path: str):
         """Load pre-trained weights"""
         self.model.load_state_dict(torch.load(path, map_location=self.device))
         self.model.eval()
+        # Weights mới: quantize / export lại
+        self._weights_key = f"{os.path.abspath(path)}:{os.path.getmtime(path)}"
+        self._build_runner()
+    
+    def _build_runner(self):
+        """Forward của self.model trên backend đã chọn"""
+        self.runner = build_runner(
+            self.model,
+            self.backend,
+            torch.zeros(1, 3, 224, 224),
+            onnx_path(self.cache_dir, "emotion_resnet50", self._weights_key),
+            self.device
+        )
+    
+    def _probabilities(self, images: List[Image.Image]) -> np.ndarray:
+        """Một forward pass cho cả batch -> probabilities [n, len(EMOTIONS)]"""
+        img_tensor = torch.stack([self.transform(image) for image in images]).to(self.device)
+        
+        with torch.no_grad():
+            outputs = self.runner(img_tensor)
+            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+        
+        return probabilities.cpu().numpy()
+    
+    def _results(self, probabilities: np.ndarray) -> List[EmotionResult]:
+        """probabilities [n, len(EMOTIONS)] -> EmotionResult cho từng ảnh"""
+        dominant = probabilities.argmax(axis=1)
+        intensities = self.calculate_emotional_intensity(probabilities)
+        return [
+            EmotionResult(
+                scores={
+                    emotion: float(score)
+                    for emotion, score in zip(self.EMOTIONS, scores)
+                },
+                emotion=self.EMOTIONS[index],
+                confidence=float(scores[index]),
+                intensity=float(intensity)
+            )
+            for scores, index, intensity in zip(probabilities, dominant, intensities)
+        ]
     
     def detect(self, image: Image.Image) -> Dict[str, float]:
         """
@@ -47,35 +129,53 @@ class EmotionDetector:
         Returns:
             Dict với emotion scores
         """
-        img_tensor = self.transform(image).unsqueeze(0).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(img_tensor)
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)
-            scores = probabilities[0].cpu().numpy()
-        
-        return {
-            emotion: float(score) 
-            for emotion, score in zip(self.EMOTIONS, scores)
-        }
+        return self.detect_full(image).scores
+    
+    def detect_full(self, image: Image.Image) -> EmotionResult:
+        """
+        Scores, cảm xúc chủ đạo, confidence và intensity từ một forward pass
+        """
+        return self._results(self._probabilities([image]))[0]
+    
+    def detect_batch(self, images: List[Image.Image]) -> List[EmotionResult]:
+        """
+        detect_full() cho nhiều ảnh: mỗi self.batch_size ảnh được stack
+        thành một tensor và chạy một forward pass
+        """
+        results = []
+        for i in range(0, len(images), self.batch_size):
+            results.extend(self._results(self._probabilities(images[i:i + self.batch_size])))
+        return results
     
     def get_dominant_emotion(self, image: Image.Image) -> Tuple[str, float]:
         """Lấy cảm xúc chủ đạo"""
-        scores = self.detect(image)
-        dominant = max(scores.items(), key=lambda x: x[1])
-        return dominant
+        result = self.detect_full(image)
+        return result.emotion, result.confidence
     
-    def calculate_emotional_intensity(self, scores: Dict[str, float]) -> float:
+    def calculate_emotional_intensity(
+        self,
+        scores: Union[Dict[str, float], np.ndarray]
+    ) -> Union[float, np.ndarray]:
         """
         Tính độ mạnh cảm xúc (0-1)
         Dựa trên entropy - ảnh có cảm xúc rõ ràng sẽ có intensity cao
+        
+        Args:
+            scores: Dict scores của một ảnh, hoặc mảng [n, len(EMOTIONS)]
+        
+        Returns:
+            float với Dict, mảng [n] với batch
         """
-        values = np.array(list(scores.values()))
+        if isinstance(scores, dict):
+            return float(self.calculate_emotional_intensity(
+                np.array(list(scores.values()))[None, :]
+            )[0])
+        
+        values = np.asarray(scores, dtype=np.float64)
         # Normalize
-        values = values / values.sum()
+        values = values / values.sum(axis=1, keepdims=True)
         # Calculate entropy
-        entropy = -np.sum(values * np.log(values + 1e-10))
-        max_entropy = np.log(len(values))
+        entropy = -np.sum(values * np.log(values + 1e-10), axis=1)
+        max_entropy = np.log(values.shape[1])
         # Intensity = 1 - normalized_entropy
-        intensity = 1 - (entropy / max_entropy)
-        return float(intensity)
+        return 1 - (entropy / max_entropy)
@@ -2,8 +2,15 @@ import torch
 from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Union, Iterator
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.clip_text_cache import ClipTextCache
+from ai.embedding_store import EmbeddingStore, content_hash
+from ai.backends import clip_image_runner
+from ai.model_bundle import load_pretrained
+from ai.image_decode import decode_for_model
 
 @dataclass
 class CuratedImage:
@@ -14,6 +21,9 @@ class CuratedImage:
     semantic_tags: List[str]
     importance_score: float
 
+# Ảnh đầu vào: PIL.Image đã mở hoặc đường dẫn file (decode trong prefetcher)
+ImageInput = Union[Image.Image, str]
+
 class ImageCurator:
     """
     AI Curator - Tự động chọn lọc và phân loại ảnh
@@ -38,25 +48,53 @@ class ImageCurator:
         "work and career", "hobbies and interests"
     ]
     
-    def __init__(self, model_name: str = "openai/clip-vit-base-patch32", device: str = 'cuda'):
+    def __init__(
+        self,
+        model_name: str = "openai/clip-vit-base-patch32",
+        device: str = 'cuda',
+        cache_dir: Optional[str] = None,
+        batch_size: int = 32,
+        decode_workers: int = 4,
+        backend: str = 'torch'
+    ):
+        """
+        Args:
+            model_name: CLIP model
+            device: 'cuda' hoặc 'cpu'
+            cache_dir: Thư mục lưu text embeddings của prompts và cache image
+                embeddings theo SHA-256, chứa model bundle offline
+                (vd: settings.MODELS_DIR)
+            batch_size: Số ảnh mỗi lần forward CLIP trong các hàm batch
+            decode_workers: Số thread decode ảnh song song cho batch kế tiếp
+            backend: Backend cho vision tower: 'torch', 'int8' hoặc 'onnx'
+        """
+        self.batch_size = max(1, batch_size)
+        self.decode_workers = max(1, decode_workers)
         self.device = torch.device(device if torch.cuda.is_available() else 'cpu')
-        self.model = CLIPModel.from_pretrained(model_name).to(self.device)
-        self.processor = CLIPProcessor.from_pretrained(model_name)
+        # Bundle offline trong cache_dir nếu đã export (ai/model_bundle.py)
+        self.model = load_pretrained(CLIPModel, cache_dir, model_name).to(self.device)
+        self.processor = load_pretrained(CLIPProcessor, cache_dir, model_name, weights=False)
         self.model.eval()
+        
+        # Text embeddings của AESTHETIC_PROMPTS / LIFE_THEMES chỉ encode một lần
+        self.text_cache = ClipTextCache(
+            self.model, self.processor, model_name, self.device, cache_dir,
+            image_encoder=clip_image_runner(self.model, backend, model_name, cache_dir)
+        )
+        
+        # Image embeddings theo nội dung file: ảnh không đổi không encode lại
+        self.embedding_store = None
+        if cache_dir:
+            # Embeddings int8/onnx lệch nhẹ so với float32: cache riêng theo backend
+            store_key = model_name if backend == 'torch' else f"{model_name}+{backend}"
+            self.embedding_store = EmbeddingStore(
+                cache_dir, store_key, self.model.config.projection_dim
+            )
     
     def calculate_aesthetic_score(self, image: Image.Image) -> float:
         """Đánh giá thẩm mỹ của ảnh (0-1)"""
-        inputs = self.processor(
-            text=self.AESTHETIC_PROMPTS,
-            images=image,
-            return_tensors="pt",
-            padding=True
-        ).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits_per_image = outputs.logits_per_image
-            probs = logits_per_image.softmax(dim=1)
+        image_embeds = self.text_cache.encode_images(image)
+        probs = self.text_cache.logits(image_embeds, self.AESTHETIC_PROMPTS).softmax(dim=1)
         
         # Trung bình các scores
         aesthetic_score = probs.mean().item()
@@ -64,23 +102,174 @@ class ImageCurator:
     
     def extract_semantic_tags(self, image: Image.Image, top_k: int = 5) -> List[Tuple[str, float]]:
         """Trích xuất các tags ngữ nghĩa từ ảnh"""
-        inputs = self.processor(
-            text=self.LIFE_THEMES,
-            images=image,
-            return_tensors="pt",
-            padding=True
-        ).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits_per_image = outputs.logits_per_image
-            probs = logits_per_image.softmax(dim=1)[0]
+        image_embeds = self.text_cache.encode_images(image)
+        probs = self.text_cache.logits(image_embeds, self.LIFE_THEMES).softmax(dim=1)[0]
         
         # Lấy top_k tags
         top_indices = torch.topk(probs, k=min(top_k, len(self.LIFE_THEMES))).indices
         tags = [(self.LIFE_THEMES[i], probs[i].item()) for i in top_indices]
         return tags
     
+    def index_image(self, data: bytes, image: Optional[Image.Image] = None) -> str:
+        """
+        Encode ảnh vừa upload vào embedding_store (nếu chưa có)
+        
+        Args:
+            data: Nội dung file
+            image: PIL.Image đã mở từ data (None = decode từ data)
+        
+        Returns:
+            SHA-256 của nội dung file
+        """
+        return self.index_images([(data, image)])[0]
+    
+    def index_images(self, items: List[Tuple[bytes, Optional[Image.Image]]]) -> List[str]:
+        """index_image() cho nhiều ảnh, các ảnh chưa có chạy chung một batch"""
+        shas = [content_hash(data) for data, _ in items]
+        if self.embedding_store is None:
+            return shas
+        
+        misses = {}
+        for sha, (data, image) in zip(shas, items):
+            if sha not in self.embedding_store and sha not in misses:
+                misses[sha] = image if image is not None else decode_for_model(data).image
+        
+        if misses:
+            embeds = self.text_cache.encode_images(list(misses.values()))
+            self.embedding_store.put_many(list(misses), embeds.float().cpu().numpy())
+        return shas
+    
+    def _prepare(self, item: ImageInput) -> Tuple[Optional[str], Optional[Image.Image]]:
+        """
+        Đọc ảnh (chạy trong thread của prefetcher)
+        
+        Returns:
+            (sha256, image); image = None nếu embedding đã có trong cache,
+            sha256 = None với PIL.Image truyền trực tiếp (không có nội dung file)
+        """
+        if isinstance(item, Image.Image):
+            return None, item
+        
+        with open(item, 'rb') as f:
+            data = f.read()
+        sha = content_hash(data)
+        if self.embedding_store is not None and sha in self.embedding_store:
+            return sha, None
+        
+        # Decode thẳng ở kích thước CLIP (JPEG draft), không bung full resolution
+        return sha, decode_for_model(data).image
+    
+    def _iter_batches(
+        self,
+        images: List[ImageInput],
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[Tuple[Optional[str], Optional[Image.Image]]]]:
+        """
+        Chia ảnh thành các batch; batch kế tiếp được đọc/decode song song
+        trong lúc batch hiện tại đang chạy CLIP
+        """
+        size = max(1, batch_size or self.batch_size)
+        chunks = [images[i:i + size] for i in range(0, len(images), size)]
+        if not chunks:
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+            pending = [pool.submit(self._prepare, item) for item in chunks[0]]
+            for i in range(len(chunks)):
+                batch = [future.result() for future in pending]
+                if i + 1 < len(chunks):
+                    pending = [pool.submit(self._prepare, item) for item in chunks[i + 1]]
+                yield batch
+    
+    def _iter_embeddings(
+        self,
+        images: List[ImageInput],
+        batch_size: Optional[int] = None
+    ) -> Iterator[torch.Tensor]:
+        """
+        Image embeddings [batch, dim] cho từng batch
+        
+        Ảnh đã có trong embedding_store được đọc từ cache; chỉ các ảnh còn
+        lại chạy vision encoder và được ghi thêm vào cache.
+        """
+        for batch in self._iter_batches(images, batch_size):
+            misses = [i for i, (_, image) in enumerate(batch) if image is not None]
+            if len(misses) == len(batch):
+                embeds = self.text_cache.encode_images([image for _, image in batch])
+            else:
+                hits = [i for i, (_, image) in enumerate(batch) if image is None]
+                embeds = torch.empty(
+                    len(batch), self.embedding_store.dim,
+                    device=self.device, dtype=self.model.dtype
+                )
+                cached = self.embedding_store.get_many([batch[i][0] for i in hits])
+                embeds[hits] = torch.from_numpy(cached).to(embeds)
+                if misses:
+                    embeds[misses] = self.text_cache.encode_images(
+                        [batch[i][1] for i in misses]
+                    )
+            
+            if self.embedding_store is not None:
+                keyed = [i for i in misses if batch[i][0] is not None]
+                if keyed:
+                    self.embedding_store.put_many(
+                        [batch[i][0] for i in keyed],
+                        embeds[keyed].float().cpu().numpy()
+                    )
+            yield embeds
+    
+    def _aesthetic_from_embeds(self, image_embeds: torch.Tensor) -> List[float]:
+        probs = self.text_cache.logits(image_embeds, self.AESTHETIC_PROMPTS).softmax(dim=1)
+        return probs.mean(dim=1).tolist()
+    
+    def _tags_from_embeds(
+        self,
+        image_embeds: torch.Tensor,
+        top_k: int = 5
+    ) -> List[List[Tuple[str, float]]]:
+        probs = self.text_cache.logits(image_embeds, self.LIFE_THEMES).softmax(dim=1)
+        top = torch.topk(probs, k=min(top_k, len(self.LIFE_THEMES)), dim=1)
+        return [
+            [(self.LIFE_THEMES[i], p) for i, p in zip(indices, values)]
+            for indices, values in zip(top.indices.tolist(), top.values.tolist())
+        ]
+    
+    def calculate_aesthetic_scores(
+        self,
+        images: List[ImageInput],
+        batch_size: Optional[int] = None
+    ) -> List[float]:
+        """
+        Phiên bản batch của calculate_aesthetic_score()
+        
+        Args:
+            images: List PIL.Image hoặc đường dẫn file
+            batch_size: Ghi đè self.batch_size
+        """
+        scores = []
+        for image_embeds in self._iter_embeddings(images, batch_size):
+            scores.extend(self._aesthetic_from_embeds(image_embeds))
+        return scores
+    
+    def extract_semantic_tags_batch(
+        self,
+        images: List[ImageInput],
+        top_k: int = 5,
+        batch_size: Optional[int] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Phiên bản batch của extract_semantic_tags()
+        
+        Args:
+            images: List PIL.Image hoặc đường dẫn file
+            top_k: Số tags mỗi ảnh
+            batch_size: Ghi đè self.batch_size
+        """
+        tags = []
+        for image_embeds in self._iter_embeddings(images, batch_size):
+            tags.extend(self._tags_from_embeds(image_embeds, top_k))
+        return tags
+    
     def calculate_importance_score(
         self,
         emotion_score: float,
@@ -108,29 +297,45 @@ class ImageCurator:
     
     def curate_images(
         self,
-        images: List[Tuple[str, Image.Image]],
+        images: List[Union[str, Tuple[str, Image.Image]]],
         emotion_scores: Dict[str, float],
         top_n: int = 50
     ) -> List[CuratedImage]:
         """
         Chọn lọc top_n ảnh quan trọng nhất
         
+        Ảnh được xử lý theo batch (self.batch_size); mỗi batch chỉ chạy
+        vision encoder một lần cho cả thẩm mỹ lẫn tags.
+        
         Args:
-            images: List of (path, PIL.Image)
+            images: List of (path, PIL.Image), hoặc chỉ path để decode song song
             emotion_scores: Dict mapping path -> emotion_intensity
             top_n: Số lượng ảnh cần chọn
         
         Returns:
             List of CuratedImage sorted by importance
         """
-        curated = []
+        paths = []
+        inputs = []
+        for item in images:
+            if isinstance(item, str):
+                paths.append(item)
+                inputs.append(item)
+            else:
+                paths.append(item[0])
+                inputs.append(item[1])
         
-        for path, image in images:
+        aesthetic_scores = []
+        all_tags = []
+        for image_embeds in self._iter_embeddings(inputs):
             # Đánh giá thẩm mỹ
-            aesthetic_score = self.calculate_aesthetic_score(image)
-            
+            aesthetic_scores.extend(self._aesthetic_from_embeds(image_embeds))
             # Trích xuất tags
-            tags = self.extract_semantic_tags(image)
+            all_tags.extend(self._tags_from_embeds(image_embeds))
+        
+        curated = []
+        
+        for path, aesthetic_score, tags in zip(paths, aesthetic_scores, all_tags):
             semantic_relevance = tags[0][1] if tags else 0.0
             
             # Tính importance
@@ -0,0 +1,49 @@
+import io
+from dataclasses import dataclass
+from typing import Union
+from PIL import Image
+
+# Cạnh ngắn của ảnh đưa vào model: CLIP ViT-B/32 và emotion đều resize về 224
+MODEL_IMAGE_SIZE = 224
+
+@dataclass
+class DecodedImage:
+    """Ảnh đã thu nhỏ cho model + kích thước gốc của file"""
+    image: Image.Image
+    width: int
+    height: int
+
+def decode_for_model(
+    source: Union[bytes, str],
+    min_side: int = MODEL_IMAGE_SIZE
+) -> DecodedImage:
+    """
+    Decode ảnh ở độ phân giải vừa đủ cho model (RGB, cạnh ngắn = min_side)
+    
+    JPEG dùng draft mode: libjpeg decode thẳng ở scale 1/2, 1/4 hoặc 1/8
+    nên ảnh 24MP không bao giờ được bung ra full resolution (6000x4000 ->
+    750x500); phần còn lại resize bicubic. Định dạng khác decode full rồi
+    resize. Các bước resize của processor CLIP / emotion sau đó gần như
+    không tốn gì.
+    
+    Args:
+        source: Bytes của file hoặc đường dẫn
+        min_side: Cạnh ngắn của ảnh trả về (ảnh nhỏ hơn giữ nguyên)
+    
+    Returns:
+        DecodedImage; width/height là kích thước gốc (lưu vào metadata)
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    width, height = image.size
+    
+    scale = min_side / min(width, height)
+    if scale < 1:
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # Chọn scale DCT lớn nhất mà ảnh vẫn >= target (không có tác dụng với PNG...)
+        image.draft("RGB", target)
+        image = image.convert("RGB")
+        if image.size != target:
+            image = image.resize(target, Image.BICUBIC, reducing_gap=2.0)
+    else:
+        image = image.convert("RGB")
+    return DecodedImage(image, width, height)
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+class BatchMetrics:
+    """Queue depth, histogram batch size và latency percentiles của một model"""
+    
+    def __init__(self, window: int = 10000):
+        """
+        Args:
+            window: Số latency gần nhất giữ lại để tính percentiles
+        """
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Counter = Counter()
+        self._latencies: Deque[float] = deque(maxlen=window)
+    
+    def record_batch(self, size: int, latencies: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.batch_sizes[size] += 1
+            self._latencies.extend(latencies)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            histogram = dict(sorted(self.batch_sizes.items()))
+            batches, items = self.batches, self.items
+        
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 2)
+        
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": round(items / batches, 2) if batches else None,
+            "batch_size_histogram": histogram,
+            "latency_ms": {
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "p99": percentile(99)
+            }
+        }
+
+class MicroBatcher:
+    """
+    Gom các request đồng thời thành batch cho một model
+    
+    Một thread worker lấy item đầu tiên trong queue rồi chờ thêm tối đa
+    max_wait_ms (hoặc tới khi đủ max_batch_size), gọi batch_fn một lần cho
+    cả batch và trả kết quả vào future của từng caller.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Args:
+            name: Tên model (dùng trong metrics)
+            batch_fn: Hàm nhận list input, trả list output cùng thứ tự
+            max_batch_size: Số item tối đa mỗi lần forward
+            max_wait_ms: Thời gian chờ tối đa để gom thêm item vào batch
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.metrics = BatchMetrics()
+        self._queue: Deque[Tuple[Any, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"batcher-{name}", daemon=True
+        )
+        self._thread.start()
+    
+    def submit(self, item: Any) -> Future:
+        """Đưa một input vào queue; future trả về output của batch_fn"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Batcher {self.name} đã đóng")
+            self._queue.append((item, future, time.perf_counter()))
+            self.metrics.queue_depth = len(self._queue)
+            self._cond.notify()
+        return future
+    
+    async def infer(self, item: Any) -> Any:
+        """submit() cho code async: chờ kết quả mà không block event loop"""
+        return await asyncio.wrap_future(self.submit(item))
+    
+    def _next_batch(self) -> List[Tuple[Any, Future, float]]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            
+            # Có item đầu tiên: chờ thêm cho tới khi đủ batch hoặc hết max_wait
+            deadline = time.perf_counter() + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            
+            size = min(len(self._queue), self.max_batch_size)
+            batch = [self._queue.popleft() for _ in range(size)]
+            self.metrics.queue_depth = len(self._queue)
+            return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            
+            # Bỏ các request đã bị hủy trước khi chạy model
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            try:
+                outputs = self.batch_fn([item for item, _, _ in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn trả {len(outputs)} kết quả cho {len(batch)} input"
+                    )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            
+            done = time.perf_counter()
+            for (_, future, _), output in zip(batch, outputs):
+                future.set_result(output)
+            self.metrics.record_batch(len(batch), [done - queued for _, _, queued in batch])
+    
+    def close(self):
+        """Dừng worker sau khi xử lý hết các item còn trong queue"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+class InferenceBroker:
+    """
+    Điểm chung để các request gửi ảnh vào model
+    
+    Mỗi model đăng ký một MicroBatcher riêng; request đồng thời tới cùng
+    model được gom thành một forward pass.
+    """
+    
+    def __init__(self, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        """
+        Args:
+            max_batch_size: Giá trị mặc định cho các model đăng ký
+            max_wait_ms: Giá trị mặc định cho các model đăng ký
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers: Dict[str, MicroBatcher] = {}
+    
+    def register(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ) -> MicroBatcher:
+        """Đăng ký model; batch_fn nhận list input và trả list output"""
+        if name in self._batchers:
+            raise ValueError(f"Model {name} đã được đăng ký")
+        batcher = MicroBatcher(
+            name,
+            batch_fn,
+            max_batch_size or self.max_batch_size,
+            self.max_wait_ms if max_wait_ms is None else max_wait_ms
+        )
+        self._batchers[name] = batcher
+        return batcher
+    
+    def submit(self, name: str, item: Any) -> Future:
+        return self._batchers[name].submit(item)
+    
+    async def infer(self, name: str, item: Any) -> Any:
+        return await self._batchers[name].infer(item)
+    
+    def metrics(self) -> Dict[str, Dict]:
+        """Metrics của từng model"""
+        return {name: batcher.metrics.snapshot() for name, batcher in self._batchers.items()}
+    
+    def close(self):
+        for batcher in self._batchers.values():
+            batcher.close()
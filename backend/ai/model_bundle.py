@@ -0,0 +1,162 @@
+"""
+Model bundle offline trong MODELS_DIR
+
+Mỗi model hub được export một lần thành thư mục
+MODELS_DIR/bundles/<org>--<name>/ (weights safetensors + config, processor)
+kèm bundle.json ghi cuối cùng. Khi bundle tồn tại, model load thẳng từ
+đĩa: không gọi hub (chạy được trên node air-gapped), weights safetensors
+được mmap thay vì unpickle vào RAM.
+
+MusicGen là ngoại lệ: audiocraft load text conditioner T5 theo tên
+("t5-base") ghi trong checkpoint, không qua bundle. Export musicgen tải
+luôn T5 vào MODELS_DIR/hf_cache (định dạng cache của hub); trên node
+offline đặt HF_HUB_CACHE=<MODELS_DIR>/hf_cache và HF_HUB_OFFLINE=1.
+
+Export: python export_models.py (xem file đó)
+"""
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+MANIFEST = "bundle.json"
+
+# Các model dùng trong project: tên bundle -> (repo id trên hub, kind)
+KNOWN_MODELS = {
+    "clip": ("openai/clip-vit-base-patch32", "clip"),
+    "emotion": ("dima806/facial_emotions_image_detection", "image-classification"),
+    "stable_diffusion": ("runwayml/stable-diffusion-v1-5", "stable-diffusion"),
+    "musicgen": ("facebook/musicgen-small", "musicgen"),
+}
+
+# Text conditioner của MusicGen, audiocraft gọi T5EncoderModel.from_pretrained(T5_REPO)
+T5_REPO = "t5-base"
+
+def bundle_path(models_dir: Optional[str], repo_id: str) -> str:
+    """Thư mục bundle của repo_id (vd: openai/clip -> bundles/openai--clip)"""
+    return os.path.join(models_dir or ".", "bundles", repo_id.replace("/", "--"))
+
+def hub_cache_dir(models_dir: Optional[str]) -> str:
+    """Cache định dạng hub cho model không load được từ bundle (T5 của MusicGen)"""
+    return os.path.join(models_dir or ".", "hf_cache")
+
+def has_bundle(models_dir: Optional[str], repo_id: str) -> bool:
+    """Bundle đã export xong (bundle.json chỉ được ghi sau khi đủ file)"""
+    return os.path.exists(os.path.join(bundle_path(models_dir, repo_id), MANIFEST))
+
+def pretrained_source(models_dir: Optional[str], repo_id: str) -> str:
+    """Đường dẫn bundle nếu có, ngược lại repo_id (tải qua hub cache)"""
+    if not models_dir:
+        return repo_id
+    if has_bundle(models_dir, repo_id):
+        return bundle_path(models_dir, repo_id)
+    print(f"⚠️  Chưa có bundle cho {repo_id}, tải từ hub (export: python export_models.py)")
+    return repo_id
+
+def load_pretrained(
+    cls,
+    models_dir: Optional[str],
+    repo_id: str,
+    weights: bool = True,
+    **kwargs
+) -> Any:
+    """
+    cls.from_pretrained() ưu tiên bundle local
+    
+    Args:
+        cls: Class transformers / diffusers (CLIPModel, CLIPProcessor, ...)
+        models_dir: settings.MODELS_DIR
+        repo_id: Repo trên hub (khóa của bundle)
+        weights: False với processor / tokenizer (không có weights)
+        **kwargs: Truyền thẳng cho from_pretrained (torch_dtype, ...)
+    """
+    source = pretrained_source(models_dir, repo_id)
+    if source != repo_id:
+        kwargs["local_files_only"] = True
+        if weights:
+            # safe_open mmap file weights, không unpickle như .bin
+            kwargs["use_safetensors"] = True
+    return cls.from_pretrained(source, **kwargs)
+
+def _write_manifest(path: str, repo_id: str, kind: str):
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(root, name)
+            files[os.path.relpath(full, path)] = os.path.getsize(full)
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({
+            "repo_id": repo_id,
+            "kind": kind,
+            "created": time.time(),
+            "files": files
+        }, f, indent=2)
+
+def _export_into(path: str, repo_id: str, kind: str, models_dir: str):
+    if kind == "clip":
+        from transformers import CLIPModel, CLIPProcessor
+        CLIPModel.from_pretrained(repo_id).save_pretrained(path, safe_serialization=True)
+        CLIPProcessor.from_pretrained(repo_id).save_pretrained(path)
+    elif kind == "image-classification":
+        from transformers import AutoImageProcessor, AutoModelForImageClassification
+        AutoModelForImageClassification.from_pretrained(repo_id).save_pretrained(
+            path, safe_serialization=True
+        )
+        AutoImageProcessor.from_pretrained(repo_id).save_pretrained(path)
+    elif kind == "stable-diffusion":
+        import torch
+        from diffusers import StableDiffusionPipeline
+        StableDiffusionPipeline.from_pretrained(
+            repo_id, torch_dtype=torch.float32
+        ).save_pretrained(path, safe_serialization=True)
+    elif kind == "musicgen":
+        # audiocraft chỉ đọc checkpoint .bin (torch.load) từ thư mục local
+        from huggingface_hub import hf_hub_download, snapshot_download
+        for filename in ("state_dict.bin", "compression_state_dict.bin"):
+            shutil.copy(hf_hub_download(repo_id, filename), os.path.join(path, filename))
+        # T5 được load theo tên: đưa vào hf_cache cạnh bundles (xem docstring module)
+        snapshot_download(
+            T5_REPO,
+            cache_dir=hub_cache_dir(models_dir),
+            allow_patterns=["*.json", "*.model", "*.safetensors"]
+        )
+    else:
+        raise ValueError(f"Kind không hợp lệ: {kind}")
+
+def export_bundle(models_dir: str, repo_id: str, kind: str, force: bool = False) -> str:
+    """
+    Tải model từ hub và ghi bundle vào models_dir
+    
+    Ghi vào thư mục tạm rồi rename, nên bundle dở dang (export bị ngắt)
+    không bao giờ được load.
+    
+    Returns:
+        Thư mục bundle
+    """
+    path = bundle_path(models_dir, repo_id)
+    if has_bundle(models_dir, repo_id) and not force:
+        return path
+    
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    _export_into(tmp_path, repo_id, kind, models_dir)
+    _write_manifest(tmp_path, repo_id, kind)
+    
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+def bundle_info(models_dir: Optional[str]) -> Dict[str, Dict]:
+    """Trạng thái bundle của các KNOWN_MODELS (cho status / export --list)"""
+    info = {}
+    for name, (repo_id, kind) in KNOWN_MODELS.items():
+        path = bundle_path(models_dir, repo_id)
+        entry = {"repo_id": repo_id, "kind": kind, "bundled": has_bundle(models_dir, repo_id)}
+        if entry["bundled"]:
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            entry["size_mb"] = round(sum(manifest["files"].values()) / (1024 * 1024), 1)
+        info[name] = entry
+    return info
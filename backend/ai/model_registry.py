@@ -0,0 +1,230 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+def resident_bytes(obj: Any, depth: int = 3) -> int:
+    """
+    Ước lượng bộ nhớ của một model: tổng parameters + buffers (và weights
+    INT8 đã pack của Linear quantize, không nằm trong parameters()) của các
+    torch nn.Module tìm được trong obj (duyệt thuộc tính tới độ sâu depth,
+    tensor dùng chung chỉ tính một lần)
+    """
+    import torch.nn as nn
+    from torch.ao.nn.quantized import Linear as QuantizedLinear
+    
+    seen_tensors = set()
+    seen_objects = set()
+    seen_packed = set()
+    total = 0
+    
+    def visit(value: Any, level: int):
+        nonlocal total
+        if id(value) in seen_objects:
+            return
+        seen_objects.add(id(value))
+        
+        if isinstance(value, nn.Module):
+            for tensor in list(value.parameters()) + list(value.buffers()):
+                if tensor.data_ptr() not in seen_tensors:
+                    seen_tensors.add(tensor.data_ptr())
+                    total += tensor.numel() * tensor.element_size()
+            for module in value.modules():
+                if isinstance(module, QuantizedLinear) and id(module) not in seen_packed:
+                    seen_packed.add(id(module))
+                    weight, bias = module._weight_bias()
+                    total += weight.numel() * weight.element_size()
+                    if bias is not None:
+                        total += bias.numel() * bias.element_size()
+            return
+        if level >= depth:
+            return
+        if isinstance(value, dict):
+            children = list(value.values())
+        elif isinstance(value, (list, tuple)):
+            children = list(value)
+        elif hasattr(value, "__dict__"):
+            children = list(vars(value).values())
+        else:
+            return
+        for child in children:
+            visit(child, level + 1)
+    
+    visit(obj, 0)
+    return total
+
+class _Entry:
+    def __init__(
+        self,
+        loader: Callable[[], Any],
+        size_fn: Callable[[Any], int],
+        warmup: Optional[Callable[[Any], Any]]
+    ):
+        self.loader = loader
+        self.size_fn = size_fn
+        self.warmup = warmup
+        self.model = None
+        self.bytes = 0
+        self.loads = 0
+        self.load_seconds: Optional[float] = None
+        self.last_used: Optional[float] = None
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """
+    Quản lý tập trung các model AI: load khi cần, đếm bộ nhớ, evict LRU
+    
+    Khi tổng bộ nhớ các model đã load vượt budget, model dùng lâu nhất
+    được giải phóng và sẽ load lại ở lần get() sau. Model đang được một
+    request dùng dở vẫn chạy tiếp (request giữ reference), bộ nhớ chỉ
+    được trả khi request đó xong.
+    """
+    
+    def __init__(self, budget_mb: int = 0):
+        """
+        Args:
+            budget_mb: Budget bộ nhớ cho tất cả model (0 = không giới hạn)
+        """
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._entries: Dict[str, _Entry] = {}
+        # Thứ tự sử dụng của các model đang load (cuối = mới dùng nhất)
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        size_fn: Callable[[Any], int] = resident_bytes,
+        warmup: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        Args:
+            name: Tên model
+            loader: Hàm tạo model (gọi lại sau mỗi lần bị evict)
+            size_fn: Ước lượng bộ nhớ của model đã load
+            warmup: Chạy một inference giả trên model đã load (xem warm_up)
+        """
+        self._entries[name] = _Entry(loader, size_fn, warmup)
+    
+    def get(self, name: str) -> Any:
+        """Model đã load (load nếu chưa có), đánh dấu là mới dùng nhất"""
+        entry = self._entries[name]
+        with self._lock:
+            model = entry.model
+            if model is not None:
+                entry.last_used = time.time()
+                self._lru.move_to_end(name)
+                return model
+        
+        # Load ngoài _lock để các model khác vẫn get() được trong lúc chờ
+        with entry.lock:
+            model = entry.model
+            evicted = False
+            if model is None:
+                start = time.perf_counter()
+                model = entry.loader()
+                load_seconds = time.perf_counter() - start
+                size = entry.size_fn(model)
+                
+                with self._lock:
+                    entry.model = model
+                    entry.bytes = size
+                    entry.loads += 1
+                    entry.load_seconds = load_seconds
+                    entry.last_used = time.time()
+                    self._lru[name] = None
+                    evicted = self._evict_over_budget(keep=name)
+            
+            if evicted:
+                self._release_memory()
+            return model
+    
+    def _evict_over_budget(self, keep: str) -> bool:
+        """Gọi khi đang giữ _lock; True nếu đã evict model nào đó"""
+        if not self.budget_bytes:
+            return False
+        evicted = False
+        for name in list(self._lru):
+            if self.loaded_bytes() <= self.budget_bytes:
+                break
+            if name == keep:
+                continue
+            self._unload(name)
+            evicted = True
+        return evicted
+    
+    def _unload(self, name: str):
+        entry = self._entries[name]
+        entry.model = None
+        entry.bytes = 0
+        self._lru.pop(name, None)
+        print(f"♻️  Evicted model {name}")
+    
+    def _release_memory(self):
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+    
+    def warm_up(self, names: Iterable[str]) -> Dict[str, float]:
+        """
+        Load trước các model và chạy một inference giả cho từng model
+        
+        Gọi lúc startup để request thật đầu tiên không phải chờ load weights,
+        khởi tạo kernel / thread pool. Model lỗi được bỏ qua (log lỗi).
+        
+        Returns:
+            Số giây warm-up của từng model đã warm thành công
+        """
+        timings = {}
+        for name in names:
+            if name not in self._entries:
+                print(f"⚠️  Warm-up: không có model {name}")
+                continue
+            start = time.perf_counter()
+            try:
+                model = self.get(name)
+                warmup = self._entries[name].warmup
+                if warmup is not None:
+                    warmup(model)
+            except Exception as e:
+                print(f"❌ Warm-up {name} thất bại: {e}")
+                continue
+            timings[name] = round(time.perf_counter() - start, 2)
+            print(f"🔥 Warm-up {name}: {timings[name]}s")
+        return timings
+    
+    def evict(self, name: str):
+        """Giải phóng model (load lại ở lần get() sau)"""
+        with self._lock:
+            if self._entries[name].model is not None:
+                self._unload(name)
+        self._release_memory()
+    
+    def loaded_bytes(self) -> int:
+        return sum(entry.bytes for entry in self._entries.values())
+    
+    def status(self) -> Dict:
+        """Các model đang load, bộ nhớ và thời gian load của từng model"""
+        with self._lock:
+            return {
+                "budget_mb": self.budget_bytes // (1024 * 1024) or None,
+                "loaded_mb": round(self.loaded_bytes() / (1024 * 1024), 1),
+                "models": {
+                    name: {
+                        "loaded": entry.model is not None,
+                        "resident_mb": round(entry.bytes / (1024 * 1024), 1),
+                        "loads": entry.loads,
+                        "last_load_seconds": (
+                            round(entry.load_seconds, 2) if entry.load_seconds is not None else None
+                        ),
+                        "last_used": entry.last_used
+                    }
+                    for name, entry in self._entries.items()
+                }
+            }
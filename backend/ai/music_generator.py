@@ -1,8 +1,11 @@
+import os
 import torch
 from audiocraft.models import MusicGen
 from audiocraft.data.audio import audio_write
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from ai.model_bundle import T5_REPO, hub_cache_dir, pretrained_source
 
 class EmotionalMusicGenerator:
     """
@@ -21,14 +24,27 @@ class EmotionalMusicGenerator:
         'disgust': 'dissonant unsettling tones'
     }
     
-    def __init__(self, model_size: str = 'small', device: str = 'cuda'):
+    def __init__(
+        self,
+        model_size: str = 'small',
+        device: str = 'cuda',
+        models_dir: Optional[str] = None
+    ):
         """
         Args:
             model_size: 'small', 'medium', 'large' (small = 300M params)
             device: 'cuda' hoặc 'cpu'
+            models_dir: Thư mục chứa model bundle offline (vd: settings.MODELS_DIR)
         """
         self.device = device
-        self.model = MusicGen.get_pretrained(f'facebook/musicgen-{model_size}', device=device)
+        # Thư mục bundle local: audiocraft đọc checkpoint thẳng từ đó
+        source = pretrained_source(models_dir, f'facebook/musicgen-{model_size}')
+        t5_cache = hub_cache_dir(models_dir)
+        if models_dir and os.path.abspath(os.getenv("HF_HUB_CACHE", "")) != os.path.abspath(t5_cache):
+            # T5 conditioner được load theo tên, không qua bundle (xem ai/model_bundle.py)
+            print(f"⚠️  {T5_REPO} của MusicGen tải qua hub cache mặc định "
+                  f"(offline: HF_HUB_CACHE={t5_cache} HF_HUB_OFFLINE=1)")
+        self.model = MusicGen.get_pretrained(source, device=device)
         self.model.set_generation_params(duration=10)  # 10 giây mỗi đoạn
     
     def generate_from_emotion(
@@ -80,7 +96,9 @@ class EmotionalMusicGenerator:
         for segment in emotion_timeline:
             emotion = segment['emotion']
             duration = segment['duration']
-            intensity = segment.get('intensity', 0.7)
+            intensity = segment.get('intensity')
+            if intensity is None:
+                intensity = 0.7
             
             # Temperature dựa trên intensity
             temperature = 0.5 + (intensity * 0.5)
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+from PIL import Image
+
+from ai.image_decode import MODEL_IMAGE_SIZE
+
+@dataclass
+class ImageSignals:
+    """Các tín hiệu rẻ tính bằng NumPy trên ảnh xám ~224px"""
+    sharpness: float  # phương sai Laplacian (thang 0-255)
+    brightness: float  # độ sáng trung bình 0-1
+    dark_fraction: float  # tỉ lệ pixel gần đen (< 16)
+    bright_fraction: float  # tỉ lệ pixel gần trắng (> 239)
+    flat_fraction: float  # tỉ lệ pixel không có gradient (screenshot, đồ họa)
+    skin_fraction: Optional[float]  # None: ảnh gần như đen trắng, không kết luận được
+
+@dataclass
+class CascadeDecision:
+    """Stage nào cần chạy cho một ảnh và lý do bỏ qua"""
+    signals: Optional[ImageSignals] = None
+    run_emotion: bool = True
+    run_clip: bool = True
+    reasons: List[str] = field(default_factory=list)
+    seconds: float = 0.0  # thời gian tính tín hiệu
+    
+    @property
+    def stages(self) -> Dict[str, bool]:
+        """Stage đã chạy (lưu cùng metadata ảnh để đo phần tiết kiệm)"""
+        return {
+            "prefilter": self.signals is not None,
+            "emotion": self.run_emotion,
+            "clip": self.run_clip
+        }
+    
+    def to_dict(self) -> Dict:
+        return {
+            "stages": self.stages,
+            "reasons": self.reasons,
+            "prefilter_ms": round(self.seconds * 1000, 2),
+            "signals": asdict(self.signals) if self.signals is not None else None
+        }
+
+class PreFilter:
+    """
+    Pre-filter rẻ trước các model đắt (emotion, CLIP)
+    
+    - Không có vùng màu da (không có mặt người): bỏ qua model cảm xúc
+      khuôn mặt.
+    - Ảnh kém rõ ràng (mờ, gần đen / cháy sáng, giống screenshot): bỏ qua
+      cả CLIP lẫn emotion, aesthetic score = 0.
+    
+    Ngưỡng mặc định thiên về an toàn: chỉ bỏ qua khi chắc chắn, ảnh ở
+    vùng biên vẫn chạy model như cũ.
+    """
+    
+    def __init__(
+        self,
+        min_sharpness: float = 15.0,
+        max_clipped_fraction: float = 0.9,
+        max_flat_fraction: float = 0.85,
+        min_skin_fraction: float = 0.01,
+        size: int = MODEL_IMAGE_SIZE
+    ):
+        """
+        Args:
+            min_sharpness: Phương sai Laplacian dưới ngưỡng = ảnh mờ
+            max_clipped_fraction: Tỉ lệ pixel gần đen / gần trắng tối đa
+            max_flat_fraction: Tỉ lệ pixel phẳng tối đa (screenshot, slide)
+            min_skin_fraction: Tỉ lệ pixel màu da tối thiểu để coi là có mặt
+            size: Cạnh ngắn khi tính tín hiệu (ngưỡng sharpness phụ thuộc scale)
+        """
+        self.min_sharpness = min_sharpness
+        self.max_clipped_fraction = max_clipped_fraction
+        self.max_flat_fraction = max_flat_fraction
+        self.min_skin_fraction = min_skin_fraction
+        self.size = size
+    
+    def signals(self, image: Image.Image) -> ImageSignals:
+        """Tính tín hiệu (~1ms với ảnh 224px)"""
+        if min(image.size) != self.size:
+            scale = self.size / min(image.size)
+            image = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.BILINEAR,
+                reducing_gap=2.0
+            )
+        gray = np.asarray(image.convert("L"), dtype=np.int16)
+        
+        # Laplacian 4 lân cận bằng slicing (không cần scipy / cv2)
+        laplacian = (
+            gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+            - 4 * gray[1:-1, 1:-1]
+        )
+        flat = (np.diff(gray, axis=1)[:-1, :] == 0) & (np.diff(gray, axis=0)[:, :-1] == 0)
+        
+        ycbcr = np.asarray(image.convert("YCbCr"), dtype=np.uint8)
+        cb, cr = ycbcr[..., 1], ycbcr[..., 2]
+        skin_fraction = None
+        if cb.std() > 2.0 or cr.std() > 2.0:
+            # Vùng màu da trong không gian CbCr (ổn định với độ sáng)
+            skin = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+            skin_fraction = float(skin.mean())
+        
+        return ImageSignals(
+            sharpness=float(laplacian.var()),
+            brightness=float(gray.mean() / 255.0),
+            dark_fraction=float((gray < 16).mean()),
+            bright_fraction=float((gray > 239).mean()),
+            flat_fraction=float(flat.mean()),
+            skin_fraction=skin_fraction
+        )
+    
+    def check(self, image: Image.Image) -> CascadeDecision:
+        """Tín hiệu + quyết định stage nào cần chạy"""
+        signals = self.signals(image)
+        decision = CascadeDecision(signals=signals)
+        
+        if signals.sharpness < self.min_sharpness:
+            decision.reasons.append("blurry")
+        if signals.dark_fraction > self.max_clipped_fraction:
+            decision.reasons.append("too_dark")
+        if signals.bright_fraction > self.max_clipped_fraction:
+            decision.reasons.append("overexposed")
+        if signals.flat_fraction > self.max_flat_fraction:
+            decision.reasons.append("screenshot")
+        if decision.reasons:
+            decision.run_clip = False
+            decision.run_emotion = False
+        
+        if signals.skin_fraction is not None and signals.skin_fraction < self.min_skin_fraction:
+            decision.reasons.append("no_face")
+            decision.run_emotion = False
+        return decision
+
+class CascadeStats:
+    """Đếm số lần mỗi stage chạy / bị bỏ qua (thread-safe)"""
+    
+    def __init__(self):
+        self._counts = Counter()
+        self._images = 0
+        self._prefilter_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, stages: Dict[str, bool], prefilter_seconds: float = 0.0):
+        with self._lock:
+            self._images += 1
+            self._prefilter_seconds += prefilter_seconds
+            for stage, ran in stages.items():
+                self._counts[(stage, ran)] += 1
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {}
+            for stage in sorted({stage for stage, _ in self._counts}):
+                ran = self._counts[(stage, True)]
+                skipped = self._counts[(stage, False)]
+                stages[stage] = {
+                    "ran": ran,
+                    "skipped": skipped,
+                    "skip_rate": round(skipped / (ran + skipped), 3) if ran + skipped else 0.0
+                }
+            return {
+                "images": self._images,
+                "prefilter_ms_avg": (
+                    round(self._prefilter_seconds / self._images * 1000, 2) if self._images else None
+                ),
+                "stages": stages
+            }
+
+def timed_check(prefilter: Optional[PreFilter], image: Image.Image) -> CascadeDecision:
+    """prefilter.check() có đo thời gian; prefilter None = chạy mọi stage"""
+    if prefilter is None:
+        return CascadeDecision()
+    start = time.perf_counter()
+    decision = prefilter.check(image)
+    decision.seconds = time.perf_counter() - start
+    return decision
@@ -4,8 +4,11 @@ from diffusers.loaders import AttnProcsLayers
 from diffusers.models.attention_processor import LoRAAttnProcessor
 from PIL import Image
 import numpy as np
+import threading
 from typing import List, Optional
 
+from ai.model_bundle import load_pretrained
+
 class PersonalStyleTransfer:
     """
     Style Transfer sử dụng Stable Diffusion với LoRA
@@ -15,12 +18,21 @@ class PersonalStyleTransfer:
     def __init__(
         self,
         model_id: str = "runwayml/stable-diffusion-v1-5",
-        device: str = "cuda"
+        device: str = "cuda",
+        models_dir: Optional[str] = None
     ):
+        """
+        Args:
+            model_id: Repo Stable Diffusion trên hub
+            device: 'cuda' hoặc 'cpu'
+            models_dir: Thư mục chứa model bundle offline (vd: settings.MODELS_DIR)
+        """
         self.device = torch.device(device if torch.cuda.is_available() else 'cpu')
         
         # Load Stable Diffusion pipeline
-        self.pipe = StableDiffusionPipeline.from_pretrained(
+        self.pipe = load_pretrained(
+            StableDiffusionPipeline,
+            models_dir,
             model_id,
             torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
             safety_checker=None
@@ -34,6 +46,10 @@ class PersonalStyleTransfer:
         # Enable memory efficient attention
         if hasattr(self.pipe, 'enable_attention_slicing'):
             self.pipe.enable_attention_slicing()
+        
+        # LoRA đang gắn trên pipe là trạng thái chung giữa các request:
+        # load + generate (train + save) phải chạy liền nhau dưới lock này
+        self.lock = threading.Lock()
     
     def setup_lora_training(self, rank: int = 4):
         """
@@ -179,3 +195,33 @@ class PersonalStyleTransfer:
     def load_lora_weights(self, path: str):
         """Load LoRA weights"""
         self.pipe.unet.load_attn_procs(path)
+    
+    def train_and_save(
+        self,
+        training_images: List[Image.Image],
+        style_prompt: str,
+        path: str,
+        num_epochs: int = 100
+    ):
+        """Train LoRA rồi lưu ngay, không request nào khác đổi LoRA ở giữa"""
+        with self.lock:
+            self.train_personal_style(
+                training_images=training_images,
+                style_prompt=style_prompt,
+                num_epochs=num_epochs
+            )
+            self.save_lora_weights(path)
+    
+    def generate_with_lora(
+        self,
+        path: str,
+        prompt: str,
+        seeds: List[Optional[int]]
+    ) -> List[Image.Image]:
+        """Load LoRA rồi tạo một ảnh cho mỗi seed, không request nào khác đổi LoRA ở giữa"""
+        with self.lock:
+            self.load_lora_weights(path)
+            return [
+                self.generate_in_personal_style(prompt=prompt, seed=seed)
+                for seed in seeds
+            ]
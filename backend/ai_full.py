@@ -7,137 +7,288 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 import io
 
+from ai.clip_text_cache import ClipTextCache
+from ai.backends import (
+    LogitsOnly, build_runner, check_backend, clip_image_runner, onnx_path, quantize_int8
+)
+from ai.model_bundle import load_pretrained, pretrained_source
+from ai.model_registry import ModelRegistry
+from ai.prefilter import CascadeDecision, CascadeStats, PreFilter, timed_check
+from core.config import settings
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+EMOTION_MODEL_NAME = "dima806/facial_emotions_image_detection"
+SD_MODEL_NAME = "runwayml/stable-diffusion-v1-5"
+
 class AIProcessor:
     """Complete AI processing"""
     
-    def __init__(self, device: str = 'cpu'):
+    AESTHETIC_PROMPTS = [
+        "a beautiful photograph",
+        "high quality image",
+        "artistic composition"
+    ]
+    
+    THEMES = [
+        "family", "celebration", "travel", "nature",
+        "friends", "work", "hobby", "pet"
+    ]
+    
+    def __init__(
+        self,
+        device: str = 'cpu',
+        models_dir: Optional[str] = None,
+        clip_backend: str = 'torch',
+        emotion_backend: str = 'torch',
+        memory_budget_mb: int = 0,
+        prefilter: bool = True
+    ):
         self.device = device
-        self._clip_model = None
-        self._emotion_model = None
-        self._sd_pipe = None
+        self.models_dir = models_dir
+        # Inference backend per model: torch, int8 or onnx (see ai/backends.py)
+        self.clip_backend = check_backend(clip_backend)
+        self.emotion_backend = check_backend(emotion_backend)
         
-    def _load_clip(self):
+        # Models load on first use and are evicted LRU-first over the budget
+        self.registry = ModelRegistry(memory_budget_mb)
+        self.registry.register("clip", self._build_clip, warmup=self._warm_clip)
+        self.registry.register("emotion", self._build_emotion, warmup=self._warm_emotion)
+        self.registry.register(
+            "stable_diffusion", self._build_stable_diffusion, warmup=self._warm_stable_diffusion
+        )
+        
+        # Cheap NumPy signals decide whether emotion / CLIP run per image
+        self.prefilter = PreFilter() if prefilter else None
+        self.cascade_stats = CascadeStats()
+    
+    def _model(self, name: str):
+        """Registry model, loading it if needed; None if it cannot be loaded"""
+        try:
+            return self.registry.get(name)
+        except Exception as e:
+            print(f"❌ {name} load failed: {e}")
+            return None
+    
+    def _build_clip(self) -> ClipTextCache:
         """Load CLIP model"""
-        if self._clip_model is None:
-            try:
-                from transformers import CLIPProcessor, CLIPModel
-                self._clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-                self._clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-                self._clip_model.eval()
-                print("✅ CLIP loaded")
-            except Exception as e:
-                print(f"❌ CLIP load failed: {e}")
-        return self._clip_model is not None
+        from transformers import CLIPProcessor, CLIPModel
+        # Offline bundle in models_dir if exported, else the hub cache
+        clip_model = load_pretrained(CLIPModel, self.models_dir, CLIP_MODEL_NAME)
+        clip_processor = load_pretrained(
+            CLIPProcessor, self.models_dir, CLIP_MODEL_NAME, weights=False
+        )
+        clip_model.eval()
+        # Prompt embeddings are encoded once per model load
+        clip = ClipTextCache(
+            clip_model,
+            clip_processor,
+            CLIP_MODEL_NAME,
+            clip_model.device,
+            self.models_dir,
+            image_encoder=clip_image_runner(
+                clip_model, self.clip_backend, CLIP_MODEL_NAME, self.models_dir
+            )
+        )
+        print("✅ CLIP loaded")
+        return clip
+    
+    def _build_emotion(self) -> Tuple:
+        """Load emotion detection: (pipeline, ONNX runner or None)"""
+        from transformers import pipeline
+        emotion_model = pipeline(
+            "image-classification",
+            model=pretrained_source(self.models_dir, EMOTION_MODEL_NAME),
+            device=self.device
+        )
+        emotion_onnx = None
+        if self.emotion_backend == "int8":
+            emotion_model.model = quantize_int8(emotion_model.model, inplace=True)
+        elif self.emotion_backend == "onnx":
+            example = emotion_model.image_processor(
+                Image.new("RGB", (224, 224)), return_tensors="pt"
+            )["pixel_values"]
+            emotion_onnx = build_runner(
+                LogitsOnly(emotion_model.model),
+                "onnx",
+                example,
+                onnx_path(self.models_dir, "emotion", EMOTION_MODEL_NAME)
+            )
+        print("✅ Emotion detector loaded")
+        return emotion_model, emotion_onnx
+    
+    def _build_stable_diffusion(self):
+        """Load Stable Diffusion"""
+        from diffusers import StableDiffusionPipeline
+        sd_pipe = load_pretrained(
+            StableDiffusionPipeline,
+            self.models_dir,
+            SD_MODEL_NAME,
+            torch_dtype=torch.float32
+        )
+        sd_pipe.to(self.device)
+        print("✅ Stable Diffusion loaded")
+        return sd_pipe
+    
+    def _load_clip(self):
+        """Load CLIP model (warm-up)"""
+        return self._model("clip") is not None
     
     def _load_emotion(self):
-        """Load emotion detection"""
-        if self._emotion_model is None:
-            try:
-                from transformers import pipeline
-                self._emotion_model = pipeline(
-                    "image-classification",
-                    model="dima806/facial_emotions_image_detection",
-                    device=self.device
-                )
-                print("✅ Emotion detector loaded")
-            except Exception as e:
-                print(f"❌ Emotion detector load failed: {e}")
-        return self._emotion_model is not None
+        """Load emotion detection (warm-up)"""
+        return self._model("emotion") is not None
     
     def _load_stable_diffusion(self):
-        """Load Stable Diffusion"""
-        if self._sd_pipe is None:
-            try:
-                from diffusers import StableDiffusionPipeline
-                self._sd_pipe = StableDiffusionPipeline.from_pretrained(
-                    "runwayml/stable-diffusion-v1-5",
-                    torch_dtype=torch.float32
-                )
-                self._sd_pipe.to(self.device)
-                print("✅ Stable Diffusion loaded")
-            except Exception as e:
-                print(f"❌ Stable Diffusion load failed: {e}")
-        return self._sd_pipe is not None
+        """Load Stable Diffusion (warm-up)"""
+        return self._model("stable_diffusion") is not None
+    
+    def warm_up(self, names: List[str]) -> Dict[str, float]:
+        """Load the given models and run one dummy inference on each"""
+        return self.registry.warm_up(names)
+    
+    def _warm_clip(self, clip: ClipTextCache):
+        image_embeds = clip.encode_images(Image.new("RGB", (224, 224)))
+        clip.logits(image_embeds, self.AESTHETIC_PROMPTS)
+        clip.logits(image_embeds, self.THEMES)
+    
+    def _warm_emotion(self, emotion: Tuple):
+        self._emotion_batch(emotion, [Image.new("RGB", (224, 224))])
+    
+    def _warm_stable_diffusion(self, sd_pipe):
+        with torch.no_grad():
+            sd_pipe(prompt="warm-up", num_inference_steps=1)
+    
+    def screen(self, image: Image.Image) -> CascadeDecision:
+        """
+        Pre-filter stage: which of emotion / CLIP this image needs
+        
+        Face-less images skip the facial emotion model; blurred, near-black,
+        blown-out or screenshot-like images skip CLIP too. Counted in
+        cascade_stats.
+        """
+        decision = timed_check(self.prefilter, image)
+        self.cascade_stats.record(decision.stages, decision.seconds)
+        return decision
+    
+    def skipped_emotion(self, decision: CascadeDecision) -> Dict:
+        """
+        analyze_emotion() result for an image the pre-filter skipped
+        
+        No face means no emotion: fields stay None so the photo is not
+        listed or counted as "neutral".
+        """
+        return {
+            "emotion": None,
+            "confidence": None,
+            "intensity": None,
+            "skipped": decision.reasons
+        }
+    
+    def skipped_clip(self, decision: CascadeDecision) -> Dict:
+        """analyze_clip() result for an image the pre-filter rejected"""
+        return {"aesthetic_score": 0.0, "tags": [], "skipped": decision.reasons}
+    
+    def analyze_image(self, image: Image.Image) -> Dict:
+        """Pre-filter, then only the emotion / CLIP stages the image needs"""
+        decision = self.screen(image)
+        return {
+            "emotion": (
+                self.analyze_emotion(image) if decision.run_emotion
+                else self.skipped_emotion(decision)
+            ),
+            "clip": (
+                self.analyze_clip(image) if decision.run_clip
+                else self.skipped_clip(decision)
+            ),
+            "cascade": decision.to_dict()
+        }
     
     def analyze_emotion(self, image: Image.Image) -> Dict:
         """Analyze emotion from image"""
-        if not self._load_emotion():
+        return self.analyze_emotion_batch([image])[0]
+    
+    def analyze_emotion_batch(self, images: List[Image.Image]) -> List[Dict]:
+        """analyze_emotion() for several images in one pipeline call"""
+        emotion = self._model("emotion")
+        if emotion is None:
             # Fallback to random
-            return {
+            return [{
                 "emotion": "happy",
                 "confidence": 0.85,
                 "intensity": 0.75,
                 "note": "Emotion detector not available"
-            }
+            } for _ in images]
         
         try:
-            results = self._emotion_model(image)
-            top_result = results[0]
-            
-            return {
-                "emotion": top_result['label'].lower(),
-                "confidence": float(top_result['score']),
-                "intensity": float(top_result['score']),
-                "all_scores": {r['label']: float(r['score']) for r in results}
-            }
+            batch_results = self._emotion_batch(emotion, images)
         except Exception as e:
-            return {
+            return [{
                 "emotion": "neutral",
                 "confidence": 0.5,
                 "intensity": 0.5,
                 "error": str(e)
-            }
+            } for _ in images]
+        
+        analyses = []
+        for results in batch_results:
+            top_result = results[0]
+            analyses.append({
+                "emotion": top_result['label'].lower(),
+                "confidence": float(top_result['score']),
+                "intensity": float(top_result['score']),
+                "all_scores": {r['label']: float(r['score']) for r in results}
+            })
+        return analyses
+    
+    def _emotion_batch(self, emotion: Tuple, images: List[Image.Image]) -> List[List[Dict]]:
+        """Pipeline-style results for a batch, on the configured backend"""
+        emotion_model, emotion_onnx = emotion
+        if emotion_onnx is not None:
+            return self._emotion_onnx_batch(emotion_model, emotion_onnx, images)
+        return emotion_model(images, batch_size=len(images))
+    
+    def _emotion_onnx_batch(
+        self,
+        emotion_model,
+        emotion_onnx,
+        images: List[Image.Image],
+        top_k: int = 5
+    ) -> List[List[Dict]]:
+        """Same output as the image-classification pipeline, run through ONNX Runtime"""
+        pixel_values = emotion_model.image_processor(
+            [image.convert("RGB") for image in images], return_tensors="pt"
+        )["pixel_values"]
+        probs = emotion_onnx(pixel_values).softmax(dim=1)
+        top = torch.topk(probs, k=min(top_k, probs.shape[1]), dim=1)
+        id2label = emotion_model.model.config.id2label
+        return [
+            [{"label": id2label[i], "score": score} for i, score in zip(indices, scores)]
+            for indices, scores in zip(top.indices.tolist(), top.values.tolist())
+        ]
     
     def calculate_aesthetic_score(self, image: Image.Image) -> float:
         """Calculate aesthetic score using CLIP"""
-        if not self._load_clip():
+        clip = self._model("clip")
+        if clip is None:
             return 0.7  # Default score
         
         try:
-            aesthetic_prompts = [
-                "a beautiful photograph",
-                "high quality image",
-                "artistic composition"
-            ]
-            
-            inputs = self._clip_processor(
-                text=aesthetic_prompts,
-                images=image,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            with torch.no_grad():
-                outputs = self._clip_model(**inputs)
-                logits = outputs.logits_per_image
-                probs = logits.softmax(dim=1)
-            
+            image_embeds = clip.encode_images(image)
+            probs = clip.logits(image_embeds, self.AESTHETIC_PROMPTS).softmax(dim=1)
             return float(probs.mean())
         except:
             return 0.7
     
     def extract_tags(self, image: Image.Image) -> List[str]:
         """Extract semantic tags"""
-        if not self._load_clip():
+        clip = self._model("clip")
+        if clip is None:
             return ["photo", "memory"]
         
         try:
-            themes = [
-                "family", "celebration", "travel", "nature",
-                "friends", "work", "hobby", "pet"
-            ]
+            themes = self.THEMES
             
-            inputs = self._clip_processor(
-                text=themes,
-                images=image,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            with torch.no_grad():
-                outputs = self._clip_model(**inputs)
-                logits = outputs.logits_per_image
-                probs = logits.softmax(dim=1)[0]
+            image_embeds = clip.encode_images(image)
+            probs = clip.logits(image_embeds, themes).softmax(dim=1)[0]
             
             # Get top 3 tags
             top_indices = torch.topk(probs, k=3).indices
@@ -146,15 +297,50 @@ class AIProcessor:
         except:
             return ["photo"]
     
-    def curate_images(
-        self,
-        images_data: List[Dict],
-        top_n: int = 50
-    ) -> List[Dict]:
-        """Curate top images"""
-        # Calculate importance scores
+    def analyze_clip(self, image: Image.Image) -> Dict:
+        """
+        Aesthetic score + semantic tags from a single CLIP forward pass
+        
+        Same results as calculate_aesthetic_score() and extract_tags(), but
+        the image is preprocessed and vision-encoded once and scored against
+        both cached prompt embedding matrices.
+        """
+        return self.analyze_clip_batch([image])[0]
+    
+    def analyze_clip_batch(self, images: List[Image.Image]) -> List[Dict]:
+        """analyze_clip() for several images in one vision forward pass"""
+        clip = self._model("clip")
+        if clip is None:
+            return [{"aesthetic_score": 0.7, "tags": ["photo", "memory"]} for _ in images]
+        
+        try:
+            image_embeds = clip.encode_images(images)
+            aesthetic_probs = clip.logits(image_embeds, self.AESTHETIC_PROMPTS).softmax(dim=1)
+            theme_probs = clip.logits(image_embeds, self.THEMES).softmax(dim=1)
+            
+            top_indices = torch.topk(theme_probs, k=3, dim=1).indices.tolist()
+            return [
+                {
+                    "aesthetic_score": score,
+                    "tags": [self.THEMES[i] for i in indices]
+                }
+                for score, indices in zip(aesthetic_probs.mean(dim=1).tolist(), top_indices)
+            ]
+        except:
+            return [{"aesthetic_score": 0.7, "tags": ["photo"]} for _ in images]
+    
+    def score_images(self, images_data: List[Dict]) -> List[Dict]:
+        """
+        Copies of images_data with importance_score set
+        
+        The records may be the storage's own dicts, so they are never
+        mutated; persist the scores with storage.update_images().
+        """
+        scored = []
         for img_data in images_data:
-            emotion_score = img_data.get('emotion_intensity', 0.5)
+            emotion_score = img_data.get('emotion_intensity')
+            if emotion_score is None:
+                emotion_score = 0.5
             aesthetic_score = img_data.get('aesthetic_score', 0.5)
             
             # Weighted average
@@ -163,11 +349,18 @@ class AIProcessor:
                 0.3 * aesthetic_score +
                 0.3 * 0.7  # semantic relevance default
             )
-            img_data['importance_score'] = importance
-        
+            scored.append({**img_data, 'importance_score': importance})
+        return scored
+    
+    def curate_images(
+        self,
+        images_data: List[Dict],
+        top_n: int = 50
+    ) -> List[Dict]:
+        """Curate top images"""
         # Sort and return top N
         sorted_images = sorted(
-            images_data,
+            self.score_images(images_data),
             key=lambda x: x.get('importance_score', 0),
             reverse=True
         )
@@ -180,12 +373,13 @@ class AIProcessor:
         guidance_scale: float = 7.5
     ) -> Optional[Image.Image]:
         """Generate image with Stable Diffusion"""
-        if not self._load_stable_diffusion():
+        sd_pipe = self._model("stable_diffusion")
+        if sd_pipe is None:
             return None
         
         try:
             with torch.no_grad():
-                result = self._sd_pipe(
+                result = sd_pipe(
                     prompt=prompt,
                     num_inference_steps=num_inference_steps,
                     guidance_scale=guidance_scale
@@ -196,4 +390,10 @@ class AIProcessor:
             return None
 
 # Global AI processor
-ai_processor = AIProcessor()
+ai_processor = AIProcessor(
+    models_dir=settings.MODELS_DIR,
+    clip_backend=settings.CLIP_BACKEND,
+    emotion_backend=settings.EMOTION_BACKEND,
+    memory_budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+    prefilter=settings.PREFILTER_ENABLED
+)
@@ -0,0 +1,31 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is an opaque, URL-safe token for the (uploaded_at, id) of the
+last row of a page; the next page starts strictly after it.
+"""
+import base64
+import json
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+def clamp_page_size(limit: int) -> int:
+    """Keep the requested page size within 1..MAX_PAGE_SIZE"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(uploaded_at: Optional[str], image_id: int) -> str:
+    """Build the cursor for the row (uploaded_at, id)"""
+    raw = json.dumps([uploaded_at, image_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """Cursor -> (uploaded_at, id); 400 if the token is malformed"""
+    try:
+        uploaded_at, image_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return uploaded_at, int(image_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
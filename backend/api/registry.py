@@ -0,0 +1,10 @@
+"""
+Model registry dùng chung cho các router trong api/routes
+
+Mỗi router đăng ký loader của model mình; registry load khi cần và evict
+model ít dùng nhất khi vượt MODEL_MEMORY_BUDGET_MB.
+"""
+from ai.model_registry import ModelRegistry
+from core.config import settings
+
+registry = ModelRegistry(budget_mb=settings.MODEL_MEMORY_BUDGET_MB)
@@ -1,48 +1,142 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only
+from typing import List, Dict, Optional
+from datetime import datetime
+import json
 
-from db.database import get_db
+from db.database import get_async_db, AsyncSessionLocal
 from db.models import ImageRecord
+from api.pagination import (
+    DEFAULT_PAGE_SIZE, clamp_page_size, encode_cursor, decode_cursor
+)
 
 router = APIRouter()
 
+# Các cột timeline cần (bỏ qua emotion_scores và các cột không dùng)
+TIMELINE_COLUMNS = load_only(
+    ImageRecord.id,
+    ImageRecord.filename,
+    ImageRecord.file_path,
+    ImageRecord.emotion,
+    ImageRecord.emotion_intensity,
+    ImageRecord.importance_score,
+    ImageRecord.semantic_tags,
+    ImageRecord.uploaded_at
+)
+
+def _timeline_entry(img: ImageRecord) -> Dict:
+    """Một ảnh trong timeline"""
+    return {
+        "id": img.id,
+        "filename": img.filename,
+        "path": img.file_path,
+        "emotion": img.emotion,
+        "emotion_intensity": img.emotion_intensity,
+        "importance_score": img.importance_score,
+        "tags": img.semantic_tags,
+        "timestamp": img.uploaded_at.isoformat()
+    }
+
 @router.get("/timeline")
-async def get_timeline(db: Session = Depends(get_db)):
+async def get_timeline(
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Lấy timeline ảnh theo thời gian và cảm xúc
     Dùng cho 3D gallery
+    
+    Phân trang keyset trên (uploaded_at, id): truyền next_cursor để lấy
+    trang tiếp theo; next_cursor = null ở trang cuối.
+    total chỉ được tính ở trang đầu tiên.
     """
-    images = db.query(ImageRecord).order_by(
-        ImageRecord.uploaded_at
-    ).all()
+    page_size = clamp_page_size(limit)
+    query = select(ImageRecord).options(TIMELINE_COLUMNS)
+    
+    if cursor:
+        last_uploaded_at, last_id = decode_cursor(cursor)
+        try:
+            last_uploaded_at = datetime.fromisoformat(last_uploaded_at)
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+        # Seek từ giá trị uploaded_at đang lưu của dòng cuối, không bind lại
+        # datetime từ cursor: SQLite lưu func.now() dạng 'YYYY-MM-DD HH:MM:SS'
+        # còn giá trị bind có thêm '.000000', so sánh chuỗi sẽ bỏ sót các
+        # ảnh trùng uploaded_at. Row-value vẫn seek được index (uploaded_at, id).
+        # Alias: cùng bảng images, không alias thì subquery bị correlate
+        # vào dòng ngoài. Dòng cuối đã bị xóa thì subquery ra NULL: dùng
+        # uploaded_at trong cursor thay vì trả về trang rỗng.
+        anchor_row = aliased(ImageRecord)
+        anchor = func.coalesce(
+            select(anchor_row.uploaded_at).where(
+                anchor_row.id == last_id
+            ).scalar_subquery(),
+            literal(last_uploaded_at, ImageRecord.uploaded_at.type)
+        )
+        query = query.where(
+            tuple_(ImageRecord.uploaded_at, ImageRecord.id) > tuple_(anchor, last_id)
+        )
+    
+    result = await db.execute(
+        query.order_by(ImageRecord.uploaded_at, ImageRecord.id).limit(page_size)
+    )
+    images = result.scalars().all()
     
-    timeline = []
-    for img in images:
-        timeline.append({
-            "id": img.id,
-            "filename": img.filename,
-            "path": img.file_path,
-            "emotion": img.emotion,
-            "emotion_intensity": img.emotion_intensity,
-            "importance_score": img.importance_score,
-            "tags": img.semantic_tags,
-            "timestamp": img.uploaded_at.isoformat()
-        })
+    total = None
+    if cursor is None:
+        total = await db.scalar(select(func.count(ImageRecord.id)))
+    
+    next_cursor = None
+    if len(images) == page_size:
+        last = images[-1]
+        next_cursor = encode_cursor(last.uploaded_at.isoformat(), last.id)
     
     return {
-        "total": len(timeline),
-        "timeline": timeline
+        "total": total,
+        "count": len(images),
+        "timeline": [_timeline_entry(img) for img in images],
+        "next_cursor": next_cursor
     }
 
+@router.get("/timeline/stream")
+async def stream_timeline():
+    """
+    Stream toàn bộ timeline dạng NDJSON (mỗi dòng một ảnh)
+    Dùng server-side cursor nên bộ nhớ server không tăng theo số ảnh
+    """
+    async def rows():
+        # Session riêng: dependency có thể đóng trước khi stream xong
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(
+                select(ImageRecord).options(TIMELINE_COLUMNS).order_by(
+                    ImageRecord.uploaded_at, ImageRecord.id
+                ).execution_options(yield_per=DEFAULT_PAGE_SIZE)
+            )
+            async for img in result:
+                yield json.dumps(_timeline_entry(img), ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
 @router.get("/by-emotion/{emotion}")
-async def get_by_emotion(emotion: str, db: Session = Depends(get_db)):
+async def get_by_emotion(emotion: str, db: AsyncSession = Depends(get_async_db)):
     """Lấy ảnh theo cảm xúc"""
-    images = db.query(ImageRecord).filter(
-        ImageRecord.emotion == emotion
-    ).order_by(
-        ImageRecord.emotion_confidence.desc()
-    ).all()
+    result = await db.execute(
+        select(ImageRecord).options(load_only(
+            ImageRecord.id,
+            ImageRecord.filename,
+            ImageRecord.file_path,
+            ImageRecord.emotion_confidence
+        )).where(
+            ImageRecord.emotion == emotion
+        ).order_by(
+            ImageRecord.emotion_confidence.desc()
+        )
+    )
+    images = result.scalars().all()
     
     return {
         "emotion": emotion,
@@ -59,11 +153,21 @@ async def get_by_emotion(emotion: str, db: Session = Depends(get_db)):
     }
 
 @router.get("/highlights")
-async def get_highlights(limit: int = 20, db: Session = Depends(get_db)):
+async def get_highlights(limit: int = 20, db: AsyncSession = Depends(get_async_db)):
     """Lấy ảnh highlights (importance cao nhất)"""
-    images = db.query(ImageRecord).order_by(
-        ImageRecord.importance_score.desc()
-    ).limit(limit).all()
+    result = await db.execute(
+        select(ImageRecord).options(load_only(
+            ImageRecord.id,
+            ImageRecord.filename,
+            ImageRecord.file_path,
+            ImageRecord.importance_score,
+            ImageRecord.emotion,
+            ImageRecord.semantic_tags
+        )).order_by(
+            ImageRecord.importance_score.desc()
+        ).limit(limit)
+    )
+    images = result.scalars().all()
     
     return {
         "count": len(images),
@@ -1,42 +1,88 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from PIL import Image
-import io
+import asyncio
+import os
 
-from db.database import get_db
+from db.database import get_async_db
 from db.models import ImageRecord
 from ai.image_curator import ImageCurator
-from ai.emotion_detector import EmotionDetector
+from ai.emotion_detector import EmotionDetector, EmotionResult
+from ai.inference_broker import InferenceBroker
+from ai.image_decode import decode_for_model
+from ai.prefilter import CascadeStats, PreFilter, timed_check
+from api.registry import registry
 from core.config import settings
+from core.executors import run_io, run_inference, write_file
 
 router = APIRouter()
 
+os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
 # Initialize AI models (singleton)
-curator = None
-emotion_detector = None
+broker = None
+
+# Pre-filter: ảnh không có mặt người không chạy model cảm xúc
+prefilter = PreFilter() if settings.PREFILTER_ENABLED else None
+cascade_stats = CascadeStats()
+
+def _warm_curator(curator: ImageCurator):
+    image = Image.new("RGB", (224, 224))
+    curator.calculate_aesthetic_scores([image])
+    curator.extract_semantic_tags_batch([image])
+
+registry.register("clip", lambda: ImageCurator(
+    device=settings.DEVICE,
+    cache_dir=settings.MODELS_DIR,
+    batch_size=settings.CURATION_BATCH_SIZE,
+    decode_workers=settings.CURATION_DECODE_WORKERS,
+    backend=settings.CLIP_BACKEND
+), warmup=_warm_curator)
+registry.register("emotion", lambda: EmotionDetector(
+    device=settings.DEVICE,
+    backend=settings.EMOTION_BACKEND,
+    cache_dir=settings.MODELS_DIR
+), warmup=lambda detector: detector.detect_batch([Image.new("RGB", (224, 224))]))
 
 def get_curator():
-    global curator
-    if curator is None:
-        curator = ImageCurator(device=settings.DEVICE)
-    return curator
+    return registry.get("clip")
 
 def get_emotion_detector():
-    global emotion_detector
-    if emotion_detector is None:
-        emotion_detector = EmotionDetector(device=settings.DEVICE)
-    return emotion_detector
+    return registry.get("emotion")
+
+def get_broker():
+    """Gom ảnh từ các request upload đồng thời thành batch cho từng model"""
+    global broker
+    if broker is None:
+        broker = InferenceBroker(
+            max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+        )
+        # Model load lần đầu trong thread của batcher, không block event loop
+        broker.register("emotion", lambda images: get_emotion_detector().detect_batch(images))
+        broker.register("clip_index", lambda items: get_curator().index_images(items))
+    return broker
+
+async def skipped_emotion() -> EmotionResult:
+    """Kết quả thay thế khi pre-filter bỏ qua model cảm xúc (không có mặt -> không có cảm xúc)"""
+    return EmotionResult(scores={}, emotion=None, confidence=None, intensity=None)
 
 @router.post("/upload")
 async def upload_images(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload và phân tích ảnh
     """
     results = []
+    records = []
+    filenames = []
+    sizes = []
+    cascades = []
+    uploads = []
     
     for file in files:
         # Validate
@@ -45,33 +91,72 @@ async def upload_images(
         
         # Read image
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
+        # Decode ngay ở kích thước model (ngoài event loop): hai batcher
+        # dùng chung ảnh nhỏ
+        decoded = await run_io(decode_for_model, contents)
+        decision = await run_io(timed_check, prefilter, decoded.image)
+        # CLIP embedding luôn chạy: curate cần embedding của mọi ảnh
+        stages = {**decision.stages, "clip": True}
+        cascade_stats.record(stages, decision.seconds)
         
-        # Detect emotion
-        detector = get_emotion_detector()
-        emotion_scores = detector.detect(image)
-        dominant_emotion, confidence = detector.get_dominant_emotion(image)
-        intensity = detector.calculate_emotional_intensity(emotion_scores)
-        
-        # Save to database
-        record = ImageRecord(
-            filename=file.filename,
-            emotion=dominant_emotion,
-            emotion_confidence=confidence,
-            emotion_intensity=intensity,
-            emotion_scores=emotion_scores
-        )
-        db.add(record)
+        filenames.append(file.filename)
+        sizes.append((decoded.width, decoded.height))
+        cascades.append((decision, stages))
+        uploads.append((contents, decoded.image))
+    
+    # Detect emotion + CLIP embedding (curate đọc lại từ cache), gom batch
+    # với các upload đang chạy đồng thời
+    inference = get_broker()
+    detections, shas = await asyncio.gather(
+        asyncio.gather(*(
+            inference.infer("emotion", image) if decision.run_emotion else skipped_emotion()
+            for (_, image), (decision, _) in zip(uploads, cascades)
+        )),
+        asyncio.gather(*(inference.infer("clip_index", upload) for upload in uploads))
+    )
+    
+    # Lưu file gốc trước khi insert: curate đọc lại ảnh (và cache embedding)
+    # theo file_path. Tiền tố sha256 để hai ảnh trùng tên không ghi đè nhau.
+    file_paths = [
+        os.path.join(settings.UPLOAD_DIR, f"{sha[:16]}_{os.path.basename(filename)}")
+        for sha, filename in zip(shas, filenames)
+    ]
+    await asyncio.gather(*(
+        run_io(write_file, file_path, contents)
+        for file_path, (contents, _) in zip(file_paths, uploads)
+    ))
+    
+    for filename, file_path, (contents, _), (width, height), (decision, stages), detection in zip(
+        filenames, file_paths, uploads, sizes, cascades, detections
+    ):
+        # Gom lại để insert một lần
+        records.append({
+            "filename": filename,
+            "file_path": file_path,
+            "file_size": len(contents),
+            "width": width,
+            "height": height,
+            "emotion": detection.emotion,
+            "emotion_confidence": detection.confidence,
+            "emotion_intensity": detection.intensity,
+            "emotion_scores": detection.scores
+        })
         
         results.append({
-            "filename": file.filename,
-            "emotion": dominant_emotion,
-            "confidence": confidence,
-            "intensity": intensity,
-            "all_scores": emotion_scores
+            "filename": filename,
+            "path": file_path,
+            "emotion": detection.emotion,
+            "confidence": detection.confidence,
+            "intensity": detection.intensity,
+            "all_scores": detection.scores,
+            "stages": stages,
+            "skipped": decision.reasons
         })
     
-    db.commit()
+    # Bulk insert: một executemany thay vì flush từng ORM object
+    if records:
+        await db.execute(insert(ImageRecord), records)
+    await db.commit()
     
     return {
         "message": f"Đã upload {len(files)} ảnh",
@@ -81,30 +166,34 @@ async def upload_images(
 @router.post("/curate")
 async def curate_collection(
     top_n: int = 50,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Chọn lọc top_n ảnh quan trọng nhất
     """
-    # Get all images from DB
-    images = db.query(ImageRecord).all()
+    # Get all images from DB (chỉ các cột cần dùng)
+    result = await db.execute(
+        select(ImageRecord.file_path, ImageRecord.emotion_intensity)
+    )
+    images = result.all()
     
     if len(images) == 0:
         raise HTTPException(404, "Chưa có ảnh nào được upload")
     
-    # Prepare data for curator
-    image_data = []
+    # Prepare data for curator (chỉ đường dẫn: curator decode theo batch)
+    image_paths = []
     emotion_scores = {}
     
     for img_record in images:
-        # Load image
-        image = Image.open(img_record.file_path)
-        image_data.append((img_record.file_path, image))
-        emotion_scores[img_record.file_path] = img_record.emotion_intensity
+        image_paths.append(img_record.file_path)
+        if img_record.emotion_intensity is not None:
+            emotion_scores[img_record.file_path] = img_record.emotion_intensity
     
-    # Run curation
-    curator_model = get_curator()
-    curated = curator_model.curate_images(image_data, emotion_scores, top_n)
+    # Run curation (load model + CLIP trong pool inference)
+    curator_model = await run_inference(get_curator)
+    curated = await run_inference(
+        curator_model.curate_images, image_paths, emotion_scores, top_n
+    )
     
     return {
         "message": f"Đã chọn lọc {len(curated)} ảnh",
@@ -120,19 +209,32 @@ async def curate_collection(
         ]
     }
 
+@router.get("/inference/metrics")
+async def get_inference_metrics():
+    """Queue depth, histogram batch size và latency percentiles của từng model"""
+    return get_broker().metrics()
+
+@router.get("/inference/cascade")
+async def get_cascade_stats():
+    """Số lần pre-filter cho chạy / bỏ qua từng stage"""
+    return cascade_stats.snapshot()
+
 @router.get("/stats")
-async def get_collection_stats(db: Session = Depends(get_db)):
+async def get_collection_stats(db: AsyncSession = Depends(get_async_db)):
     """Thống kê collection"""
-    total = db.query(ImageRecord).count()
+    # Một query GROUP BY (chạy trên index emotion), không load từng record
+    result = await db.execute(
+        select(ImageRecord.emotion, func.count(ImageRecord.id)).group_by(ImageRecord.emotion)
+    )
+    rows = result.all()
+    
+    # Ảnh không có mặt người (emotion NULL) vẫn tính vào total
+    emotions = {emotion: count for emotion, count in rows if emotion is not None}
+    total = sum(count for _, count in rows)
     
     if total == 0:
         return {"total": 0, "emotions": {}}
     
-    # Count by emotion
-    emotions = {}
-    for record in db.query(ImageRecord).all():
-        emotions[record.emotion] = emotions.get(record.emotion, 0) + 1
-    
     return {
         "total": total,
         "emotions": emotions
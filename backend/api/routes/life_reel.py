@@ -1,40 +1,56 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from typing import List, Dict
 from PIL import Image
 import cv2
 import numpy as np
 
-from db.database import get_db
+from db.database import get_async_db
 from db.models import ImageRecord, LifeReelJob
 from ai.music_generator import EmotionalMusicGenerator
 from core.config import settings
+from api.registry import registry
+from core.executors import run_reel
 
 router = APIRouter()
 
-# Initialize music generator
-music_gen = None
+# Music generator (load/evict qua registry)
+registry.register(
+    "musicgen",
+    lambda: EmotionalMusicGenerator(
+        model_size='small', device=settings.DEVICE, models_dir=settings.MODELS_DIR
+    ),
+    warmup=lambda music_gen: music_gen.generate_from_emotion('neutral', duration=1.0)
+)
 
 def get_music_generator():
-    global music_gen
-    if music_gen is None:
-        music_gen = EmotionalMusicGenerator(model_size='small', device=settings.DEVICE)
-    return music_gen
+    return registry.get("musicgen")
 
 @router.post("/create")
 async def create_life_reel(
     duration_per_image: float = 3.0,
     transition_duration: float = 1.0,
     background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Tạo Life-art Reel từ ảnh đã curate
     """
     # Get curated images
-    images = db.query(ImageRecord).order_by(
-        ImageRecord.importance_score.desc()
-    ).limit(20).all()
+    result = await db.execute(
+        # Chỉ các cột process_life_reel dùng
+        select(ImageRecord).options(load_only(
+            ImageRecord.id,
+            ImageRecord.file_path,
+            ImageRecord.emotion,
+            ImageRecord.emotion_intensity
+        )).order_by(
+            ImageRecord.importance_score.desc()
+        ).limit(20)
+    )
+    images = result.scalars().all()
     
     if len(images) == 0:
         raise HTTPException(404, "Chưa có ảnh nào để tạo reel")
@@ -45,11 +61,12 @@ async def create_life_reel(
         total_images=len(images)
     )
     db.add(job)
-    db.commit()
+    await db.commit()
     
-    # Process in background
+    # Process in background (pool reel riêng: MusicGen + encode video chạy nhiều phút)
     if background_tasks:
         background_tasks.add_task(
+            run_reel,
             process_life_reel,
             job.id,
             images,
@@ -115,7 +132,7 @@ def process_life_reel(
         job.status = "completed"
         job.output_path = final_path
         db.commit()
-        
+    
     except Exception as e:
         job = db.query(LifeReelJob).filter(LifeReelJob.id == job_id).first()
         job.status = "failed"
@@ -183,9 +200,9 @@ def merge_audio_video(video_path: str, audio_path: str, output_path: str):
     subprocess.run(cmd, check=True)
 
 @router.get("/status/{job_id}")
-async def get_job_status(job_id: int, db: Session = Depends(get_db)):
+async def get_job_status(job_id: int, db: AsyncSession = Depends(get_async_db)):
     """Check trạng thái job"""
-    job = db.query(LifeReelJob).filter(LifeReelJob.id == job_id).first()
+    job = await db.get(LifeReelJob, job_id)
     
     if not job:
         raise HTTPException(404, "Job không tồn tại")
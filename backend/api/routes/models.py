@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from ai.model_bundle import bundle_info
+from api.registry import registry
+from core.config import settings
+from core.executors import run_inference
+
+router = APIRouter()
+
+@router.on_event("startup")
+async def warm_up_models():
+    """Opt-in (WARMUP_MODELS): load trước và chạy inference giả trước khi nhận request"""
+    if settings.WARMUP_MODELS:
+        await run_inference(registry.warm_up, settings.WARMUP_MODELS)
+
+@router.get("/status")
+async def get_models_status():
+    """Model nào đang load, bộ nhớ và thời gian load của từng model"""
+    return registry.status()
+
+@router.get("/bundles")
+async def get_model_bundles():
+    """Model bundle offline đã export trong MODELS_DIR"""
+    return bundle_info(settings.MODELS_DIR)
@@ -1,24 +1,27 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from typing import List
-from PIL import Image
-import io
 
-from db.database import get_db
+from db.database import get_async_db
 from db.models import StyleModel
 from ai.style_transfer_model import PersonalStyleTransfer
 from core.config import settings
+from api.registry import registry
+from core.executors import run_io, run_inference, decode_image
 
 router = APIRouter()
 
-# Global style transfer model
-style_model = None
+# Style transfer model (load/evict qua registry)
+registry.register(
+    "stable_diffusion",
+    lambda: PersonalStyleTransfer(device=settings.DEVICE, models_dir=settings.MODELS_DIR),
+    warmup=lambda model: model.generate_in_personal_style("warm-up", num_inference_steps=1)
+)
 
 def get_style_model():
-    global style_model
-    if style_model is None:
-        style_model = PersonalStyleTransfer(device=settings.DEVICE)
-    return style_model
+    return registry.get("stable_diffusion")
 
 @router.post("/train")
 async def train_personal_style(
@@ -27,7 +30,7 @@ async def train_personal_style(
     style_prompt: str,
     files: List[UploadFile] = File(...),
     num_epochs: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Huấn luyện LoRA model trên phong cách cá nhân
@@ -46,21 +49,20 @@ async def train_personal_style(
     training_images = []
     for file in files:
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
+        image = await run_io(decode_image, contents)
         training_images.append(image)
     
-    # Train model
-    model = get_style_model()
-    model.train_personal_style(
+    # Train model + save LoRA weights (một lần submit, giữ lock của pipeline)
+    model = await run_inference(get_style_model)
+    model_path = f"./models/lora_{name}.safetensors"
+    await run_inference(
+        model.train_and_save,
         training_images=training_images,
         style_prompt=style_prompt,
+        path=model_path,
         num_epochs=num_epochs
     )
     
-    # Save LoRA weights
-    model_path = f"./models/lora_{name}.safetensors"
-    model.save_lora_weights(model_path)
-    
     # Save to database
     style_record = StyleModel(
         name=name,
@@ -71,7 +73,7 @@ async def train_personal_style(
         style_prompt=style_prompt
     )
     db.add(style_record)
-    db.commit()
+    await db.commit()
     
     return {
         "message": "Training hoàn tất!",
@@ -85,32 +87,30 @@ async def generate_in_style(
     prompt: str,
     num_images: int = 1,
     seed: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Tạo ảnh mới theo phong cách đã học
     """
     # Get model info
-    style_record = db.query(StyleModel).filter(StyleModel.id == model_id).first()
+    style_record = await db.get(StyleModel, model_id)
     if not style_record:
         raise HTTPException(404, "Model không tồn tại")
     
-    # Load LoRA weights
-    model = get_style_model()
-    model.load_lora_weights(style_record.model_path)
+    # Load LoRA weights + generate images (một lần submit, giữ lock của pipeline)
+    model = await run_inference(get_style_model)
+    images = await run_inference(
+        model.generate_with_lora,
+        style_record.model_path,
+        prompt=f"{prompt}, {style_record.style_prompt}",
+        seeds=[seed + i if seed else None for i in range(num_images)]
+    )
     
-    # Generate images
     results = []
-    for i in range(num_images):
-        current_seed = seed + i if seed else None
-        image = model.generate_in_personal_style(
-            prompt=f"{prompt}, {style_record.style_prompt}",
-            seed=current_seed
-        )
-        
+    for i, image in enumerate(images):
         # Save image
         output_path = f"./output/generated_{model_id}_{i}.png"
-        image.save(output_path)
+        await run_io(image.save, output_path)
         results.append(output_path)
     
     return {
@@ -119,9 +119,18 @@ async def generate_in_style(
     }
 
 @router.get("/models")
-async def list_style_models(db: Session = Depends(get_db)):
+async def list_style_models(db: AsyncSession = Depends(get_async_db)):
     """Liệt kê các style models đã train"""
-    models = db.query(StyleModel).all()
+    result = await db.execute(
+        select(StyleModel).options(load_only(
+            StyleModel.id,
+            StyleModel.name,
+            StyleModel.description,
+            StyleModel.num_training_images,
+            StyleModel.created_at
+        ))
+    )
+    models = result.scalars().all()
     
     return {
         "total": len(models),
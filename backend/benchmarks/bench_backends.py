@@ -0,0 +1,143 @@
+"""
+Benchmark + accuracy drift check: torch vs int8 vs onnx inference backends
+
+For each backend, runs the model on the same images and reports:
+  - latency (batch 1) and throughput (--batch-size)
+  - drift against the float32 torch outputs
+      clip:    min cosine similarity of image embeddings, max aesthetic
+               score difference, top-3 tag agreement
+      emotion: max probability difference, top-1 agreement
+
+Exits with status 1 if a backend drifts past --min-cosine / --max-prob-diff,
+so it can gate a backend change. Random images are used unless
+--images-dir points at real photos (recommended for the drift numbers).
+
+Usage:
+    python benchmarks/bench_backends.py --model clip --images-dir ./uploads
+    python benchmarks/bench_backends.py --model emotion --weights models/emotion.pt
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from PIL import Image
+
+from ai.backends import BACKENDS
+
+def load_images(count: int, images_dir: str = None):
+    if images_dir:
+        names = sorted(os.listdir(images_dir))[:count]
+        return [Image.open(os.path.join(images_dir, name)).convert("RGB") for name in names]
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 256, (512, 512, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+def timed(fn, images, batch_size: int):
+    """(outputs, ms per image at batch 1, images/s at batch_size)"""
+    fn(images[:1])  # Warm-up
+    start = time.perf_counter()
+    for image in images[:8]:
+        fn([image])
+    latency = (time.perf_counter() - start) / min(8, len(images)) * 1000
+    
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        outputs.append(fn(images[i:i + batch_size]))
+    throughput = len(images) / (time.perf_counter() - start)
+    return torch.cat(outputs), latency, throughput
+
+def clip_backends(images, batch_size: int, cache_dir: str):
+    from ai.image_curator import ImageCurator
+    
+    results = {}
+    for backend in BACKENDS:
+        curator = ImageCurator(device="cpu", cache_dir=cache_dir, backend=backend)
+        embeds, latency, throughput = timed(curator.text_cache.encode_images, images, batch_size)
+        results[backend] = (curator, embeds, latency, throughput)
+    
+    reference_curator, reference, _, _ = results["torch"]
+    ref_scores = reference_curator._aesthetic_from_embeds(reference)
+    ref_tags = [[t for t, _ in tags[:3]] for tags in reference_curator._tags_from_embeds(reference)]
+    
+    rows = []
+    for backend, (curator, embeds, latency, throughput) in results.items():
+        cosine = (embeds * reference).sum(dim=1).min().item()
+        scores = curator._aesthetic_from_embeds(embeds)
+        tags = [[t for t, _ in tags[:3]] for tags in curator._tags_from_embeds(embeds)]
+        rows.append({
+            "backend": backend,
+            "latency": latency,
+            "throughput": throughput,
+            "min_cosine": cosine,
+            "max_diff": max(abs(a - b) for a, b in zip(scores, ref_scores)),
+            "agreement": sum(a == b for a, b in zip(tags, ref_tags)) / len(tags)
+        })
+    return rows
+
+def emotion_backends(images, batch_size: int, cache_dir: str, weights: str = None):
+    from ai.emotion_detector import EmotionDetector
+    
+    results = {}
+    for backend in EmotionDetector.BACKENDS:
+        # Without --weights: same random initialisation in every backend
+        torch.manual_seed(0)
+        detector = EmotionDetector(
+            model_path=weights, device="cpu", backend=backend, cache_dir=cache_dir
+        )
+        fn = lambda batch, d=detector: torch.from_numpy(d._probabilities(batch))
+        results[backend] = timed(fn, images, batch_size)
+    
+    reference = results["torch"][0]
+    rows = []
+    for backend, (probs, latency, throughput) in results.items():
+        rows.append({
+            "backend": backend,
+            "latency": latency,
+            "throughput": throughput,
+            "max_diff": (probs - reference).abs().max().item(),
+            "agreement": (probs.argmax(dim=1) == reference.argmax(dim=1)).float().mean().item()
+        })
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", choices=["clip", "emotion"], default="clip")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--images-dir")
+    parser.add_argument("--weights", help="EmotionDetector weights (emotion only)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--max-prob-diff", type=float, default=0.05)
+    args = parser.parse_args()
+    
+    images = load_images(args.images, args.images_dir)
+    cache_dir = tempfile.mkdtemp()
+    if args.model == "clip":
+        rows = clip_backends(images, args.batch_size, cache_dir)
+    else:
+        rows = emotion_backends(images, args.batch_size, cache_dir, args.weights)
+    
+    print("=" * 70)
+    print(f"  {args.model}: {len(images)} images, batch {args.batch_size}, {torch.get_num_threads()} threads")
+    print("=" * 70)
+    failed = False
+    for row in rows:
+        line = (f"  {row['backend']:<6} {row['latency']:8.1f} ms/img (b=1)  {row['throughput']:8.1f} img/s"
+                f"  max diff {row['max_diff']:.4f}  agree {row['agreement']:.1%}")
+        ok = row['max_diff'] <= args.max_prob_diff
+        if "min_cosine" in row:
+            line += f"  cos {row['min_cosine']:.4f}"
+            ok = ok and row['min_cosine'] >= args.min_cosine
+        failed = failed or not ok
+        print(line + ("" if ok else "  DRIFT"))
+    
+    sys.exit(1 if failed else 0)
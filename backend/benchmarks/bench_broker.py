@@ -0,0 +1,122 @@
+"""
+Load test: per-request forwards vs the InferenceBroker under concurrent uploads
+
+Concurrent clients each send --requests images to one model:
+  - direct: every request runs its own batch-size-1 forward (in a thread,
+            one forward at a time, as with a single model instance)
+  - broker: requests go through InferenceBroker and share batched forwards
+
+--model synthetic (default) simulates a forward that costs --overhead-ms
+plus --item-ms per image, so it runs without any model installed.
+--model clip runs AIProcessor.analyze_clip_batch on random images.
+
+Usage:
+    python benchmarks/bench_broker.py --clients 32 --requests 20
+    python benchmarks/bench_broker.py --model clip --clients 16 --requests 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.inference_broker import InferenceBroker
+
+class SyntheticModel:
+    """Fixed per-forward overhead + per-item cost; one forward at a time"""
+    
+    def __init__(self, overhead_ms: float, item_ms: float):
+        self.overhead = overhead_ms / 1000
+        self.item = item_ms / 1000
+        self._lock = threading.Lock()
+    
+    def __call__(self, items):
+        with self._lock:
+            time.sleep(self.overhead + self.item * len(items))
+        return [0.5 for _ in items]
+
+def clip_model(count: int):
+    import numpy as np
+    from PIL import Image
+    from ai_full import AIProcessor
+    
+    processor = AIProcessor()
+    if not processor._load_clip():
+        sys.exit("CLIP not available")
+    rng = np.random.default_rng(0)
+    items = [
+        Image.fromarray(rng.integers(0, 256, (512, 512, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+    lock = threading.Lock()
+    
+    def forward(images):
+        with lock:
+            return processor.analyze_clip_batch(images)
+    
+    forward(items[:1])  # Warm-up
+    return forward, items
+
+async def run(call, items, clients: int, requests: int):
+    """(requests per second, p50 ms, p99 ms)"""
+    latencies = []
+    
+    async def client(offset: int):
+        for i in range(requests):
+            start = time.perf_counter()
+            await call(items[(offset + i) % len(items)])
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", choices=["synthetic", "clip"], default="synthetic")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--overhead-ms", type=float, default=20.0)
+    parser.add_argument("--item-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    
+    if args.model == "clip":
+        forward, items = clip_model(args.clients)
+    else:
+        forward, items = SyntheticModel(args.overhead_ms, args.item_ms), list(range(args.clients))
+    
+    async def direct(item):
+        return (await asyncio.to_thread(forward, [item]))[0]
+    
+    broker = InferenceBroker(args.max_batch_size, args.max_wait_ms)
+    broker.register(args.model, forward)
+    
+    async def brokered(item):
+        return await broker.infer(args.model, item)
+    
+    print("=" * 70)
+    print(f"  {args.model}: {args.clients} clients x {args.requests} requests, "
+          f"max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms")
+    print("=" * 70)
+    results = {}
+    for name, call in (("direct", direct), ("broker", brokered)):
+        rps, p50, p99 = asyncio.run(run(call, items, args.clients, args.requests))
+        results[name] = rps
+        print(f"  {name:<7} {rps:10.1f} req/s   p50 {p50:8.1f} ms   p99 {p99:8.1f} ms")
+    print(f"  speedup {results['broker'] / results['direct']:10.2f}x")
+    
+    metrics = broker.metrics()[args.model]
+    print(f"  batch sizes: {metrics['batch_size_histogram']}")
+    print(f"  broker latency (ms): {metrics['latency_ms']}")
+    broker.close()
@@ -0,0 +1,65 @@
+"""
+Benchmark: pre-filter cascade skip rates and cost
+
+Runs ai.prefilter.PreFilter over a directory of photos (decoded at model
+size, as uploads are) and reports how often each stage would be skipped,
+why, and the pre-filter time per image next to the decode time. Use it on a
+representative sample before tuning the thresholds.
+
+Usage:
+    python benchmarks/bench_cascade.py --images-dir ./uploads
+    python benchmarks/bench_cascade.py --images-dir ./uploads --min-sharpness 30 --verbose
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.image_decode import decode_for_model
+from ai.prefilter import CascadeStats, PreFilter, timed_check
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images-dir", required=True)
+    parser.add_argument("--min-sharpness", type=float, default=15.0)
+    parser.add_argument("--min-skin-fraction", type=float, default=0.01)
+    parser.add_argument("--verbose", action="store_true", help="Print signals per image")
+    args = parser.parse_args()
+    
+    prefilter = PreFilter(
+        min_sharpness=args.min_sharpness, min_skin_fraction=args.min_skin_fraction
+    )
+    stats = CascadeStats()
+    reasons = Counter()
+    decode_seconds = 0.0
+    
+    for name in sorted(os.listdir(args.images_dir)):
+        path = os.path.join(args.images_dir, name)
+        start = time.perf_counter()
+        try:
+            decoded = decode_for_model(path)
+        except Exception:
+            continue
+        decode_seconds += time.perf_counter() - start
+        
+        decision = timed_check(prefilter, decoded.image)
+        stats.record(decision.stages, decision.seconds)
+        reasons.update(decision.reasons)
+        if args.verbose:
+            print(f"  {name:<40} {decision.reasons or 'ok'}  {decision.signals}")
+    
+    snapshot = stats.snapshot()
+    if not snapshot["images"]:
+        sys.exit("No images decoded")
+    
+    print("=" * 70)
+    print(f"  {snapshot['images']} images, decode {decode_seconds / snapshot['images'] * 1000:.1f} ms/img,"
+          f" pre-filter {snapshot['prefilter_ms_avg']:.2f} ms/img")
+    print("=" * 70)
+    for stage, counts in snapshot["stages"].items():
+        print(f"  {stage:<10} ran {counts['ran']:>6}  skipped {counts['skipped']:>6}  ({counts['skip_rate']:.1%})")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:<12} {count:>6}")
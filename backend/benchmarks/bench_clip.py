@@ -0,0 +1,64 @@
+"""
+Benchmark: separate CLIP calls vs AIProcessor.analyze_clip
+
+Compares calculate_aesthetic_score() + extract_tags() (two forward
+passes per image) with the fused analyze_clip() on the same images, and
+checks that both paths agree.
+
+Usage:
+    python benchmarks/bench_clip.py --images 32 --size 1024
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from ai_full import AIProcessor
+
+def make_images(count: int, size: int):
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+    
+    processor = AIProcessor()
+    if not processor._load_clip():
+        sys.exit("CLIP not available")
+    
+    images = make_images(args.images, args.size)
+    # Warm-up
+    processor.analyze_clip(images[0])
+    
+    start = time.perf_counter()
+    separate = [
+        (processor.calculate_aesthetic_score(img), processor.extract_tags(img))
+        for img in images
+    ]
+    t_separate = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    fused = [processor.analyze_clip(img) for img in images]
+    t_fused = time.perf_counter() - start
+    
+    max_diff = max(abs(a - f['aesthetic_score']) for (a, _), f in zip(separate, fused))
+    same_tags = all(t == f['tags'] for (_, t), f in zip(separate, fused))
+    
+    print("=" * 70)
+    print(f"  {args.images} images, {args.size}x{args.size}")
+    print("=" * 70)
+    print(f"  separate : {t_separate / args.images * 1000:8.1f} ms/image")
+    print(f"  fused    : {t_fused / args.images * 1000:8.1f} ms/image")
+    print(f"  speedup  : {t_separate / t_fused:8.2f}x")
+    print(f"  max aesthetic diff: {max_diff:.2e}, same tags: {same_tags}")
@@ -0,0 +1,66 @@
+"""
+Benchmark: per-image vs batched ImageCurator curation
+
+Writes JPEGs to a scratch directory and curates them by path:
+  - per-image: calculate_aesthetic_score() + extract_semantic_tags() per image
+  - batched:   curate_images() at each --batch-sizes value (CLIP batches with
+               the next batch decoded in parallel)
+
+Usage:
+    python benchmarks/bench_curation.py --images 128 --size 1024 --batch-sizes 1 8 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from ai.image_curator import ImageCurator
+
+def make_images(count: int, size: int, directory: str):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"IMG_{i}.jpg")
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=128)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+    
+    curator = ImageCurator(device=args.device, decode_workers=args.workers)
+    paths = make_images(args.images, args.size, tempfile.mkdtemp())
+    emotion_scores = {path: 0.5 for path in paths}
+    # Warm-up (cũng encode text embeddings của prompts)
+    curator.curate_images(paths[:2], emotion_scores)
+    
+    print("=" * 70)
+    print(f"  {args.images} images, {args.size}x{args.size}, {args.workers} decode workers")
+    print("=" * 70)
+    
+    start = time.perf_counter()
+    for path in paths:
+        image = Image.open(path)
+        curator.calculate_aesthetic_score(image)
+        curator.extract_semantic_tags(image)
+    baseline = args.images / (time.perf_counter() - start)
+    print(f"  per-image        {baseline:8.1f} images/s")
+    
+    for batch_size in args.batch_sizes:
+        curator.batch_size = batch_size
+        start = time.perf_counter()
+        curator.curate_images(paths, emotion_scores, top_n=args.images)
+        rate = args.images / (time.perf_counter() - start)
+        print(f"  batch {batch_size:<10} {rate:8.1f} images/s  ({rate / baseline:.2f}x)")
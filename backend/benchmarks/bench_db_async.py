@@ -0,0 +1,121 @@
+"""
+Benchmark: sync Session vs AsyncSession inside async def routes
+
+Serves the gallery queries both ways from one in-process FastAPI app and
+fires concurrent requests through httpx's ASGI transport:
+  - sync:  the previous pattern (db.query(...) with get_db in async def)
+  - async: the api.routes.gallery router (AsyncSession, get_async_db)
+
+Usage:
+    python benchmarks/bench_db_async.py --rows 50000 --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read at import time, so point them at a scratch database first
+_workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/bench.db"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from api.routes import gallery
+from core.config import settings
+from db.database import Base, SessionLocal, engine, get_db
+from db.models import ImageRecord
+
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+app = FastAPI()
+app.include_router(gallery.router, prefix="/async")
+
+@app.get("/sync/highlights")
+async def sync_highlights(limit: int = 20, db: Session = Depends(get_db)):
+    images = db.query(ImageRecord).order_by(
+        ImageRecord.importance_score.desc()
+    ).limit(limit).all()
+    return {"count": len(images), "highlights": [img.id for img in images]}
+
+@app.get("/sync/by-emotion/{emotion}")
+async def sync_by_emotion(emotion: str, db: Session = Depends(get_db)):
+    images = db.query(ImageRecord).filter(
+        ImageRecord.emotion == emotion
+    ).order_by(ImageRecord.emotion_confidence.desc()).all()
+    return {"count": len(images), "images": [img.id for img in images]}
+
+def size_sync_pool(concurrency: int):
+    """
+    One pooled connection per concurrent request for the sync phase
+    
+    The sync routes check connections out on the event loop and only
+    return them when get_db's teardown runs; with the default 5 + 10
+    QueuePool the loop blocks on checkout until it times out.
+    """
+    SessionLocal.configure(bind=create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=concurrency,
+        max_overflow=0
+    ))
+
+def seed(rows: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.bulk_insert_mappings(ImageRecord, [
+        {
+            "filename": f"IMG_{i}.jpg",
+            "file_path": f"uploads/IMG_{i}.jpg",
+            "emotion": random.choice(EMOTIONS),
+            "emotion_confidence": random.random(),
+            "emotion_intensity": random.random(),
+            "importance_score": random.random(),
+            "semantic_tags": ["family", "travel"],
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+async def run(prefix: str, total: int, concurrency: int) -> float:
+    """Requests per second for a mix of highlights / by-emotion calls"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(
+                f"/{prefix}/highlights" if i % 2 else f"/{prefix}/by-emotion/{random.choice(EMOTIONS)}"
+            )
+        
+        async def worker():
+            while not queue.empty():
+                response = await client.get(queue.get_nowait())
+                response.raise_for_status()
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    
+    seed(args.rows)
+    size_sync_pool(args.concurrency)
+    print("=" * 70)
+    print(f"  {args.rows} rows, {args.requests} requests, concurrency {args.concurrency}")
+    print("=" * 70)
+    for prefix in ("sync", "async"):
+        rps = asyncio.run(run(prefix, args.requests, args.concurrency))
+        print(f"  {prefix:<6} {rps:>10.1f} req/s")
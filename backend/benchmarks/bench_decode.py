@@ -0,0 +1,64 @@
+"""
+Benchmark: full-resolution decode vs JPEG draft decode for model input
+
+Encodes one large JPEG (default 6000x4000, a 24 MP phone photo), then times
+  - full:  Image.open + load at full resolution + resize to 224 short side
+  - draft: ai.image_decode.decode_for_model (libjpeg DCT scaling)
+and reports the mean absolute pixel difference between the two 224 images.
+
+Usage:
+    python benchmarks/bench_decode.py --width 6000 --height 4000 --repeat 20
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from ai.image_decode import MODEL_IMAGE_SIZE, decode_for_model
+
+def make_jpeg(width: int, height: int) -> bytes:
+    # Smooth gradients + noise: closer to a photo than pure noise
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    rng = np.random.default_rng(0)
+    pixels = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    pixels += rng.normal(0, 8, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def decode_full(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    scale = MODEL_IMAGE_SIZE / min(image.size)
+    return image.resize((round(image.width * scale), round(image.height * scale)), Image.BICUBIC)
+
+def timed(fn, data: bytes, repeat: int):
+    result = fn(data)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    data = make_jpeg(args.width, args.height)
+    full, full_ms = timed(decode_full, data, args.repeat)
+    draft, draft_ms = timed(lambda d: decode_for_model(d).image, data, args.repeat)
+    diff = np.abs(np.asarray(full, dtype=np.float32) - np.asarray(draft, dtype=np.float32)).mean()
+    
+    print("=" * 70)
+    print(f"  {args.width}x{args.height} JPEG ({len(data) / 1e6:.1f} MB) -> {draft.width}x{draft.height}")
+    print("=" * 70)
+    print(f"  full decode + resize  {full_ms:8.1f} ms")
+    print(f"  draft decode          {draft_ms:8.1f} ms  ({full_ms / draft_ms:.1f}x faster)")
+    print(f"  mean abs pixel diff   {diff:8.2f} / 255")
@@ -0,0 +1,109 @@
+"""
+Latency test: /health while heavy requests are in flight
+
+Runs the main_full_py314 app in-process (httpx ASGI transport) and probes
+/health every --probe-ms while --clients concurrent clients call
+/api/style/generate. Generation is replaced by a --gen-ms sleep (torch
+releases the GIL the same way), so this needs no model download.
+
+Two phases:
+  - inline:   a copy of the route that calls generate_image() directly in
+              the async handler (the previous behaviour)
+  - executor: the real route, which runs it through core.executors
+
+The executor phase must keep /health p99 under --max-p99-ms, otherwise
+the script exits 1 (the inline phase is only reported for comparison).
+
+Usage:
+    python benchmarks/bench_health.py --clients 4 --gen-ms 500 --seconds 5
+    python benchmarks/bench_health.py --max-p99-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Storage is created at import time, so point it at a scratch file first
+_workdir = tempfile.mkdtemp()
+os.environ["STORAGE_PATH"] = os.path.join(_workdir, "data.json")
+os.chdir(_workdir)
+
+import httpx
+
+from main_full_py314 import app, storage
+from ai_full import ai_processor
+
+@app.post("/bench/inline-generate")
+async def inline_generate(model_id: int, prompt: str):
+    model = storage.get_style_model(model_id)
+    image = ai_processor.generate_image(f"{prompt}, {model['style_prompt']}")
+    return {"generated": image is not None}
+
+async def run(path: str, model_id: int, clients: int, seconds: float, probe_ms: float):
+    """(p50, p99, max) /health latency in ms"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        deadline = time.perf_counter() + seconds
+        latencies = []
+        
+        async def load():
+            while time.perf_counter() < deadline:
+                response = await client.post(path, params={"model_id": model_id, "prompt": "a cat"})
+                response.raise_for_status()
+        
+        async def probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get("/health")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(probe_ms / 1000)
+        
+        await asyncio.gather(probe(), *(load() for _ in range(clients)))
+    
+    latencies.sort()
+    return (
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+        latencies[-1] * 1000
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--gen-ms", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--probe-ms", type=float, default=20)
+    parser.add_argument("--max-p99-ms", type=float, default=100,
+                        help="Fail if /health p99 exceeds this in the executor phase")
+    args = parser.parse_args()
+    
+    def slow_generate(prompt, *a, **kw):
+        time.sleep(args.gen_ms / 1000)
+        return None
+    
+    ai_processor.generate_image = slow_generate
+    storage.wait_until_ready()
+    model_id = storage.add_style_model({
+        "name": "bench", "description": "", "style_prompt": "watercolor",
+        "num_training_images": 5, "status": "trained"
+    })['id']
+    
+    print("=" * 70)
+    print(f"  {args.clients} clients, {args.gen_ms:.0f} ms per generation, {args.seconds:.0f} s")
+    print("=" * 70)
+    failed = False
+    for name, path in (("inline", "/bench/inline-generate"), ("executor", "/api/style/generate")):
+        p50, p99, worst = asyncio.run(run(path, model_id, args.clients, args.seconds, args.probe_ms))
+        verdict = ""
+        if name == "executor":
+            ok = p99 <= args.max_p99_ms
+            verdict = "OK" if ok else f"FAIL (> {args.max_p99_ms:.0f} ms)"
+            failed = failed or not ok
+        print(f"  {name:<9} /health p50 {p50:8.1f} ms   p99 {p99:8.1f} ms   max {worst:8.1f} ms   {verdict}")
+    
+    sys.exit(1 if failed else 0)
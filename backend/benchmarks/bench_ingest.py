@@ -0,0 +1,60 @@
+"""
+Benchmark: IngestionPool throughput vs worker count
+
+Encodes random JPEGs once, then pushes them through an IngestionPool for
+each --workers value (torch threads per worker = cpu_count // workers) and
+reports images/s. Model loading happens in the pool initializer and is
+excluded by a warm-up round.
+
+Usage:
+    python benchmarks/bench_ingest.py --images 256 --workers 1 2 4 8
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from ingest_pool import IngestionPool
+
+def make_jpegs(count: int, size: int):
+    rng = np.random.default_rng(0)
+    blobs = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(buffer, "JPEG")
+        blobs.append(buffer.getvalue())
+    return blobs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    blobs = make_jpegs(args.images, args.size)
+    
+    print("=" * 70)
+    print(f"  {args.images} images, {args.size}x{args.size}, {os.cpu_count()} CPUs")
+    print("=" * 70)
+    baseline = None
+    for workers in args.workers:
+        pool = IngestionPool(workers)
+        # Warm-up: start every worker and load its models
+        wait([pool.submit(blob) for blob in blobs[:workers * 2]])
+        
+        start = time.perf_counter()
+        wait([pool.submit(blob) for blob in blobs])
+        rate = args.images / (time.perf_counter() - start)
+        pool.close()
+        
+        baseline = baseline or rate / workers
+        print(f"  {workers:>2} workers x {pool.torch_threads:>2} threads  {rate:8.1f} images/s"
+              f"  ({rate / baseline:.2f}x of 1 worker)")
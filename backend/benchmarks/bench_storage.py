@@ -0,0 +1,105 @@
+"""
+Benchmark: SimpleStorage (JSON + journal) vs SQLiteStorage
+
+Usage:
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --sizes 10000,100000 --engines sqlite
+    python benchmarks/bench_storage.py --sizes 1000000 --json-max 1000000
+
+The JSON engine keeps everything in memory and is skipped above
+--json-max images (100k by default), where it takes far too long to fill.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_simple import SimpleStorage
+from storage_sqlite import SQLiteStorage
+
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+TAGS = ["family", "celebration", "travel", "nature", "friends", "work", "hobby", "pet"]
+
+def make_record(i: int) -> dict:
+    """Synthetic record shaped like /api/images/upload output"""
+    scores = {e: random.random() for e in EMOTIONS}
+    emotion = max(scores, key=scores.get)
+    return {
+        "filename": f"IMG_{i:07d}.jpg",
+        "file_path": f"uploads/IMG_{i:07d}.jpg",
+        "emotion": emotion,
+        "emotion_confidence": scores[emotion],
+        "emotion_intensity": random.random(),
+        "emotion_scores": scores,
+        "aesthetic_score": random.random(),
+        "importance_score": random.random(),
+        "semantic_tags": random.sample(TAGS, 3),
+        "width": 4032,
+        "height": 3024
+    }
+
+def open_engine(name: str, workdir: str):
+    if name == "json":
+        return SimpleStorage(
+            os.path.join(workdir, "data.json"), commit_window=0, background_load=False
+        )
+    return SQLiteStorage(os.path.join(workdir, "data.db"))
+
+def timed(fn, repeat: int) -> float:
+    """Average seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def run(engine_name: str, size: int) -> dict:
+    random.seed(size)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = open_engine(engine_name, workdir)
+        
+        start = time.perf_counter()
+        for i in range(size):
+            engine.add_image(make_record(i))
+        insert = (time.perf_counter() - start) / size
+        
+        ids = [random.randint(1, size) for _ in range(10000)]
+        it = iter(ids)
+        point = timed(lambda: engine.get_image(next(it)), len(ids))
+        by_emotion = timed(lambda: engine.get_images_by_emotion(random.choice(EMOTIONS)), 10)
+        top_k = timed(lambda: engine.get_top_images(20), 100)
+        stats = timed(engine.get_stats, 100)
+        engine.close()
+    
+    return {
+        "insert": insert,
+        "point": point,
+        "by_emotion": by_emotion,
+        "top_k": top_k,
+        "stats": stats
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--engines", default="json,sqlite")
+    parser.add_argument("--json-max", type=int, default=100000,
+                        help="Skip the json engine above this many images")
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print(f"{'engine':<8}{'images':>10}{'insert':>10}{'point':>10}"
+          f"{'emotion':>12}{'top-20':>10}{'stats':>10}")
+    print("  (microseconds per operation)")
+    print("=" * 70)
+    for size in (int(s) for s in args.sizes.split(",")):
+        for engine_name in args.engines.split(","):
+            if engine_name == "json" and size > args.json_max:
+                print(f"{engine_name:<8}{size:>10}  skipped (--json-max {args.json_max})")
+                continue
+            r = run(engine_name, size)
+            print(f"{engine_name:<8}{size:>10}{r['insert'] * 1e6:>10.1f}{r['point'] * 1e6:>10.1f}"
+                  f"{r['by_emotion'] * 1e6:>12.0f}{r['top_k'] * 1e6:>10.1f}{r['stats'] * 1e6:>10.1f}")
@@ -12,16 +12,38 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./artistic_vault.db"
+    ASYNC_DATABASE_URL: str = ""  # để trống = suy ra từ DATABASE_URL (aiosqlite / asyncpg)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # giây
     
     # Storage
     MINIO_ENDPOINT: str = "localhost:9000"
     MINIO_ACCESS_KEY: str = "minioadmin"
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET: str = "artistic-vault"
+    UPLOAD_DIR: str = "./uploads"  # file ảnh gốc (ImageRecord.file_path)
     
     # AI Models
     MODELS_DIR: str = "./models"
     DEVICE: str = "cuda"  # hoặc "cpu"
+    CLIP_BACKEND: str = "torch"  # "torch" | "int8" | "onnx" (ai/backends.py)
+    EMOTION_BACKEND: str = "torch"  # "torch" | "int8" | "onnx"; ResNet50 của api/routes chỉ "torch" | "onnx"
+    WARMUP_MODELS: List[str] = []  # load + inference giả lúc startup, tên như export_models.py (vd: ["clip","emotion"])
+    MODEL_MEMORY_BUDGET_MB: int = 0  # tổng bộ nhớ cho các model, 0 = không giới hạn (LRU evict)
+    PREFILTER_ENABLED: bool = True  # bỏ qua model cảm xúc khi ảnh không có mặt người (ai/prefilter.py)
+    CURATION_BATCH_SIZE: int = 32  # số ảnh mỗi lần forward CLIP
+    CURATION_DECODE_WORKERS: int = 4  # thread decode ảnh song song
+    INFERENCE_MAX_BATCH_SIZE: int = 16  # micro-batching giữa các request
+    INFERENCE_MAX_WAIT_MS: float = 5.0  # thời gian chờ gom batch
+    INGEST_WORKERS: int = 0  # > 0: phân tích upload trong process pool (ingest_pool)
+    INGEST_TORCH_THREADS: int = 0  # torch threads mỗi worker, 0 = cpu_count // INGEST_WORKERS
+    
+    # Executors (core/executors.py)
+    IO_WORKERS: int = 0  # 0 = min(32, cpu_count + 4)
+    INFERENCE_WORKERS: int = 1  # một instance model, torch tự song song hóa bên trong
+    REEL_WORKERS: int = 1  # job Life Reel (MusicGen + cv2 + ffmpeg), tách khỏi pool inference
+    EXECUTOR_MAX_PENDING: int = 256
     
     # Processing
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB
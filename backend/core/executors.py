@@ -0,0 +1,106 @@
+"""
+Executor layer cho các handler async
+
+Torch, PIL và file I/O đều là code đồng bộ; gọi trực tiếp trong async def
+sẽ block event loop (kể cả /health). Ba pool riêng, có giới hạn:
+  - io: đọc/ghi file, decode ảnh PIL, storage
+  - inference: forward model (Stable Diffusion, CLIP, LoRA training)
+  - reel: job Life Reel chạy nhiều phút (MusicGen + cv2 + ffmpeg), không
+    chiếm pool inference của curate / generate
+
+Cấu hình qua Settings: IO_WORKERS, INFERENCE_WORKERS, REEL_WORKERS,
+EXECUTOR_MAX_PENDING.
+"""
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from PIL import Image
+
+from core.config import settings
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor với số việc đang chờ có giới hạn
+    
+    Khi đã có max_workers + max_pending việc, coroutine gọi run() chờ
+    (không block event loop) thay vì xếp hàng vô hạn trong pool.
+    """
+    
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=name
+        )
+        self._slots = asyncio.Semaphore(self.max_workers + max(0, max_pending))
+    
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Chạy fn(*args, **kwargs) trong pool và chờ kết quả"""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+    
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+_io: Optional[BoundedExecutor] = None
+_inference: Optional[BoundedExecutor] = None
+_reel: Optional[BoundedExecutor] = None
+
+def io_executor() -> BoundedExecutor:
+    global _io
+    if _io is None:
+        _io = BoundedExecutor(
+            "io",
+            settings.IO_WORKERS or min(32, (os.cpu_count() or 1) + 4),
+            settings.EXECUTOR_MAX_PENDING
+        )
+    return _io
+
+def inference_executor() -> BoundedExecutor:
+    global _inference
+    if _inference is None:
+        # Mặc định 1: một instance model, torch tự song song hóa bên trong
+        _inference = BoundedExecutor(
+            "inference",
+            settings.INFERENCE_WORKERS,
+            settings.EXECUTOR_MAX_PENDING
+        )
+    return _inference
+
+def reel_executor() -> BoundedExecutor:
+    global _reel
+    if _reel is None:
+        _reel = BoundedExecutor(
+            "reel",
+            settings.REEL_WORKERS,
+            settings.EXECUTOR_MAX_PENDING
+        )
+    return _reel
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """File I/O / decode ảnh / storage trong pool io"""
+    return await io_executor().run(fn, *args, **kwargs)
+
+async def run_inference(fn: Callable, *args, **kwargs) -> Any:
+    """Forward model trong pool inference"""
+    return await inference_executor().run(fn, *args, **kwargs)
+
+async def run_reel(fn: Callable, *args, **kwargs) -> Any:
+    """Job Life Reel trong pool reel riêng"""
+    return await reel_executor().run(fn, *args, **kwargs)
+
+def decode_image(data: bytes) -> Image.Image:
+    """Mở và decode ảnh từ bytes (gọi qua run_io)"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+def write_file(path: str, data: bytes):
+    """Ghi bytes ra file (gọi qua run_io)"""
+    with open(path, 'wb') as f:
+        f.write(data)
@@ -0,0 +1,40 @@
+"""
+Migration schema cho database
+
+Tạo các bảng và index còn thiếu trên database đã có sẵn (idempotent):
+    python -m db.migrations
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from db.database import Base, engine as default_engine
+from db import models  # noqa: F401  (đăng ký models vào Base.metadata)
+
+def upgrade(engine: Engine = default_engine) -> list:
+    """
+    Tạo bảng/index còn thiếu
+    
+    Returns:
+        Danh sách index vừa được tạo
+    """
+    # Bảng mới được tạo kèm index của chúng
+    Base.metadata.create_all(bind=engine)
+    
+    inspector = inspect(engine)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+if __name__ == "__main__":
+    created = upgrade()
+    if created:
+        print("✅ Đã tạo index:")
+        for name in created:
+            print(f"  - {name}")
+    else:
+        print("✅ Schema đã cập nhật, không có gì để làm")
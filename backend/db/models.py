@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Text, Index
 from sqlalchemy.sql import func
 from db.database import Base
 
@@ -26,6 +26,16 @@ class ImageRecord(Base):
     width = Column(Integer)
     height = Column(Integer)
     file_size = Column(Integer)
+    
+    # Index cho các query của gallery / life reel (xem db/migrations.py)
+    __table_args__ = (
+        # /by-emotion: WHERE emotion = ? ORDER BY emotion_confidence DESC
+        Index("ix_images_emotion_confidence", "emotion", "emotion_confidence"),
+        # /highlights, /life-reel/create: ORDER BY importance_score DESC LIMIT n
+        Index("ix_images_importance_score", "importance_score"),
+        # /timeline: keyset ORDER BY uploaded_at, id
+        Index("ix_images_uploaded_at_id", "uploaded_at", "id"),
+    )
 
 class LifeReelJob(Base):
     """Bảng theo dõi job tạo Life Reel"""
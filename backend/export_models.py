@@ -0,0 +1,56 @@
+"""
+Export offline model bundles into MODELS_DIR
+
+Downloads each model once from the Hugging Face hub and writes it to
+MODELS_DIR/bundles/<org>--<name>/ with safetensors weights (see
+ai/model_bundle.py). Once a bundle exists the app loads it from disk, never
+touching the hub, so the bundles directory can be copied to air-gapped
+nodes as-is.
+
+Usage:
+    python export_models.py                      # every known model
+    python export_models.py clip emotion         # selected models
+    python export_models.py --list
+    python export_models.py --repo openai/clip-vit-large-patch14 --kind clip
+"""
+import argparse
+import os
+import sys
+import time
+
+from ai.model_bundle import KNOWN_MODELS, bundle_info, export_bundle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="*",
+                        help=f"Models to export: {', '.join(KNOWN_MODELS)} (default: all)")
+    parser.add_argument("--models-dir", default=os.getenv("MODELS_DIR", "./models"))
+    parser.add_argument("--repo", help="Export another hub repo (requires --kind)")
+    parser.add_argument("--kind", choices=["clip", "image-classification", "stable-diffusion", "musicgen"])
+    parser.add_argument("--force", action="store_true", help="Re-export existing bundles")
+    parser.add_argument("--list", action="store_true", help="Show bundle status and exit")
+    args = parser.parse_args()
+    
+    if args.list:
+        for name, info in bundle_info(args.models_dir).items():
+            status = f"{info['size_mb']} MB" if info["bundled"] else "missing"
+            print(f"  {name:<18} {info['repo_id']:<45} {status}")
+        sys.exit(0)
+    
+    if args.repo:
+        if not args.kind:
+            parser.error("--repo requires --kind")
+        targets = [(args.repo, args.kind)]
+    else:
+        unknown = [name for name in args.models if name not in KNOWN_MODELS]
+        if unknown:
+            parser.error(f"unknown model(s): {', '.join(unknown)}")
+        targets = [KNOWN_MODELS[name] for name in (args.models or KNOWN_MODELS)]
+    
+    print("=" * 70)
+    print(f"  Exporting {len(targets)} bundle(s) to {os.path.abspath(args.models_dir)}")
+    print("=" * 70)
+    for repo_id, kind in targets:
+        start = time.perf_counter()
+        path = export_bundle(args.models_dir, repo_id, kind, force=args.force)
+        print(f"  ✅ {repo_id:<45} {time.perf_counter() - start:6.1f}s  {path}")
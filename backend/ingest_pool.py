@@ -0,0 +1,106 @@
+"""
+Process-pool ingestion workers
+
+On CPU-only hosts one process runs every AIProcessor forward under one GIL
+and one torch intra-op pool. IngestionPool starts num_workers processes
+instead; each loads the emotion and CLIP models once at start-up and then
+takes image bytes from the pool's call queue, returning the same analysis
+the upload route builds in-process.
+
+torch threads per worker default to cpu_count // num_workers, so the
+workers together use each core once instead of oversubscribing. The
+worker side lives in ingest_worker, which imports nothing heavy.
+
+Workers are spawned, so each one re-imports the parent's __main__ module:
+create the pool under ``if __name__ == "__main__"`` or in an app startup
+hook, never at import time. If a worker dies (e.g. OOM kill) the pool is
+rebuilt; only the uploads in flight at that moment fail.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Dict, Optional
+
+import ingest_worker
+
+class IngestionPool:
+    """Worker processes that analyze uploaded image bytes"""
+    
+    def __init__(
+        self,
+        num_workers: int,
+        torch_threads: int = 0,
+        models_dir: Optional[str] = None,
+        **processor_kwargs
+    ):
+        """
+        Args:
+            num_workers: Number of worker processes
+            torch_threads: torch threads per worker (0 = cpu_count // num_workers)
+            models_dir: Passed to each worker's AIProcessor
+            **processor_kwargs: Other AIProcessor arguments (clip_backend, prefilter, ...)
+        """
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self._processor_kwargs = {"models_dir": models_dir, **processor_kwargs}
+        self._lock = threading.Lock()
+        self.restarts = 0
+        self._executor = self._new_executor()
+    
+    def _new_executor(self) -> ProcessPoolExecutor:
+        """Executor with a fresh set of workers, asked to start (and load models) now"""
+        # spawn: never fork a parent that may already hold torch thread pools
+        executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ingest_worker.init_worker,
+            initargs=(self.torch_threads, self._processor_kwargs)
+        )
+        # Warm-up only: the first uploads need not wait for the model loads
+        for _ in range(self.num_workers):
+            executor.submit(ingest_worker.started)
+        return executor
+    
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a broken executor (a worker died); no-op if already replaced"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            print(f"⚠️ Ingest worker died, restarting {self.num_workers} workers")
+            self._executor = self._new_executor()
+            self.restarts += 1
+        broken.shutdown(wait=False)
+    
+    def submit(self, data: bytes) -> Future:
+        """
+        Queue one file's bytes; the future resolves to its analysis
+        
+        Fails with BrokenProcessPool if a worker died while it was queued;
+        the pool is rebuilt, so later submits work again.
+        """
+        executor = self._executor
+        try:
+            future = executor.submit(ingest_worker.analyze, data)
+        except BrokenProcessPool:
+            self._restart(executor)
+            return self._executor.submit(ingest_worker.analyze, data)
+        future.add_done_callback(partial(self._check_broken, executor))
+        return future
+    
+    def _check_broken(self, executor: ProcessPoolExecutor, future: Future):
+        """Done callback: rebuild the pool as soon as a task reports a dead worker"""
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart(executor)
+    
+    async def analyze(self, data: bytes) -> Dict:
+        """submit() for async handlers"""
+        return await asyncio.wrap_future(self.submit(data))
+    
+    def close(self):
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=True)
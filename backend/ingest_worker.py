@@ -0,0 +1,44 @@
+"""
+Entry module for IngestionPool worker processes
+
+Only the standard library is imported at module level: spawn imports this
+module in every worker (see IngestionPool), and torch must not be imported
+before init_worker has pinned the thread counts.
+"""
+import os
+from typing import Dict
+
+# Per-process state, set by init_worker
+_processor = None
+
+def init_worker(torch_threads: int, processor_kwargs: Dict):
+    """Runs once in each worker process: pin thread counts, load models"""
+    global _processor
+    # Must be set before torch creates its thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    
+    import torch
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+    
+    # Configured by the parent, so workers never read settings themselves
+    from ai_full import AIProcessor
+    _processor = AIProcessor(**processor_kwargs)
+    _processor._load_emotion()
+    _processor._load_clip()
+
+def started() -> int:
+    """No-op task used to spawn the workers up front"""
+    return os.getpid()
+
+def analyze(data: bytes) -> Dict:
+    """Decode + pre-filter + emotion / CLIP for one uploaded file"""
+    from ai.image_decode import decode_for_model
+    
+    decoded = decode_for_model(data)
+    return {
+        **_processor.analyze_image(decoded.image),
+        "width": decoded.width,
+        "height": decoded.height
+    }
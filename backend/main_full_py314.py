@@ -2,18 +2,27 @@
 Python 3.14 Full Version - Complete AI Features
 No SQLAlchemy, using simple JSON storage
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Dict, List, Optional
 import uvicorn
-from PIL import Image
-import io
+import asyncio
+import json
 import os
 
 # Import our modules
-from storage_simple import storage
+from storage_simple import storage, StorageNotReady
 from ai_full import ai_processor
+from ai.inference_broker import InferenceBroker
+from ai.model_bundle import bundle_info
+from ai.image_decode import decode_for_model
+from ingest_pool import IngestionPool
+from core.config import settings
+from core.executors import run_io, run_inference, write_file
+from api.pagination import (
+    DEFAULT_PAGE_SIZE, clamp_page_size, encode_cursor, decode_cursor
+)
 
 app = FastAPI(
     title="Artistic Memory Vault API - Full",
@@ -30,6 +39,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(StorageNotReady)
+async def storage_not_ready(request: Request, exc: StorageNotReady):
+    """Requests that arrive while the vault is still loading get a retryable 503"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Storage is still loading, retry shortly", "status": "loading"},
+        headers={"Retry-After": "1"}
+    )
+
+# Concurrent uploads share batched forward passes per model
+broker = InferenceBroker(
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
+broker.register("emotion", ai_processor.analyze_emotion_batch)
+broker.register("clip", ai_processor.analyze_clip_batch)
+
+# INGEST_WORKERS > 0: analyze uploads in worker processes instead
+ingest_pool: Optional[IngestionPool] = None
+
+@app.on_event("startup")
+async def start_ingest_pool():
+    """
+    Started here rather than at import: spawned workers re-import this
+    module, and must not start pools of their own
+    """
+    global ingest_pool
+    if settings.INGEST_WORKERS > 0:
+        ingest_pool = IngestionPool(
+            num_workers=settings.INGEST_WORKERS,
+            torch_threads=settings.INGEST_TORCH_THREADS,
+            models_dir=settings.MODELS_DIR,
+            clip_backend=settings.CLIP_BACKEND,
+            emotion_backend=settings.EMOTION_BACKEND,
+            memory_budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+            prefilter=settings.PREFILTER_ENABLED
+        )
+
+@app.on_event("shutdown")
+async def stop_ingest_pool():
+    if ingest_pool is not None:
+        await run_io(ingest_pool.close)
+
+@app.on_event("startup")
+async def warm_up_models():
+    """
+    Opt-in: WARMUP_MODELS=["clip","emotion"] preloads those models (from
+    their MODELS_DIR bundles) and runs one dummy inference before serving,
+    so the first real request does not pay the load
+    """
+    if settings.WARMUP_MODELS:
+        await run_inference(ai_processor.warm_up, settings.WARMUP_MODELS)
+
 # Create output directory
 os.makedirs("output", exist_ok=True)
 os.makedirs("uploads", exist_ok=True)
@@ -54,6 +116,15 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    if not storage.ready:
+        # Snapshot still loading in the background
+        return {
+            "status": "loading",
+            "mode": "full-py314",
+            "stats": None
+        }
+    
+    # O(1) and lock-free: never queue the probe behind journal fsyncs
     stats = storage.get_stats()
     return {
         "status": "healthy",
@@ -63,49 +134,96 @@ async def health_check():
 
 # ==================== IMAGES ====================
 
+async def skipped(result: Dict) -> Dict:
+    """Stand-in awaitable for a stage the pre-filter ruled out"""
+    return result
+
+async def analyze_upload(contents: bytes) -> Dict:
+    """Emotion + CLIP analysis of one uploaded file; raises if it is not an image"""
+    if ingest_pool is not None:
+        analysis = await ingest_pool.analyze(contents)
+        # Worker counters are per process: count the stages here
+        cascade = analysis["cascade"]
+        ai_processor.cascade_stats.record(cascade["stages"], cascade["prefilter_ms"] / 1000)
+        return analysis
+    
+    # Decode once at model size (off the event loop): the emotion and
+    # CLIP workers share the small image
+    decoded = await run_io(decode_for_model, contents)
+    decision = await run_io(ai_processor.screen, decoded.image)
+    
+    # Batched with other in-flight uploads; stages the pre-filter
+    # ruled out are not run at all
+    emotion_data, clip_data = await asyncio.gather(
+        broker.infer("emotion", decoded.image) if decision.run_emotion
+        else skipped(ai_processor.skipped_emotion(decision)),
+        broker.infer("clip", decoded.image) if decision.run_clip
+        else skipped(ai_processor.skipped_clip(decision))
+    )
+    return {
+        "emotion": emotion_data,
+        "clip": clip_data,
+        "cascade": decision.to_dict(),
+        "width": decoded.width,
+        "height": decoded.height
+    }
+
 @app.post("/api/images/upload")
 async def upload_images(files: List[UploadFile] = File(...)):
-    """Upload and analyze images with full AI"""
+    """
+    Upload and analyze images with full AI
+    
+    Files that fail (not an image, analysis error) are listed in "failed"
+    with the reason; the others are stored as usual.
+    """
     results = []
+    failed = []
+    
+    # Read images, then analyze them all concurrently
+    contents_list = [await file.read() for file in files]
+    analyses = await asyncio.gather(
+        *(analyze_upload(contents) for contents in contents_list),
+        return_exceptions=True
+    )
     
-    for file in files:
-        # Read image
-        contents = await file.read()
-        try:
-            image = Image.open(io.BytesIO(contents))
-        except:
+    for file, contents, analysis in zip(files, contents_list, analyses):
+        if isinstance(analysis, Exception):
+            print(f"❌ Upload {file.filename} failed: {analysis!r}")
+            failed.append({"filename": file.filename, "error": str(analysis) or type(analysis).__name__})
             continue
         
         # Save file
         file_path = f"uploads/{file.filename}"
-        with open(file_path, 'wb') as f:
-            f.write(contents)
+        await run_io(write_file, file_path, contents)
         
         # AI Analysis
-        emotion_data = ai_processor.analyze_emotion(image)
-        aesthetic_score = ai_processor.calculate_aesthetic_score(image)
-        tags = ai_processor.extract_tags(image)
+        emotion_data = analysis['emotion']
+        clip_data = analysis['clip']
+        aesthetic_score = clip_data['aesthetic_score']
+        tags = clip_data['tags']
         
-        # Calculate importance
+        # Calculate importance (no face -> neutral emotion weight)
+        intensity = emotion_data.get('intensity')
         importance = (
-            0.4 * emotion_data.get('intensity', 0.5) +
+            0.4 * (0.5 if intensity is None else intensity) +
             0.3 * aesthetic_score +
             0.3 * 0.7
         )
         
-        # Store in database
-        image_data = storage.add_image({
+        # Store in database (waits for the journal fsync)
+        image_data = await run_io(storage.add_image, {
             "filename": file.filename,
             "file_path": file_path,
-            "emotion": emotion_data.get('emotion', 'neutral'),
-            "emotion_confidence": emotion_data.get('confidence', 0.5),
-            "emotion_intensity": emotion_data.get('intensity', 0.5),
+            "emotion": emotion_data.get('emotion'),
+            "emotion_confidence": emotion_data.get('confidence'),
+            "emotion_intensity": intensity,
             "emotion_scores": emotion_data.get('all_scores', {}),
             "aesthetic_score": aesthetic_score,
             "importance_score": importance,
             "semantic_tags": tags,
-            "width": image.width,
-            "height": image.height
+            "width": analysis['width'],
+            "height": analysis['height'],
+            "stages": analysis['cascade']['stages']
         })
         
         results.append({
@@ -115,24 +233,31 @@ async def upload_images(files: List[UploadFile] = File(...)):
             "intensity": emotion_data.get('intensity'),
             "aesthetic_score": aesthetic_score,
             "tags": tags,
-            "importance": importance
+            "importance": importance,
+            "stages": analysis['cascade']['stages'],
+            "skipped": analysis['cascade']['reasons']
         })
     
     return {
-        "message": f"Uploaded and analyzed {len(files)} files",
+        "message": f"Uploaded and analyzed {len(results)} of {len(files)} files",
         "results": results,
-        "total_images": len(storage.get_images())
+        "failed": failed,
+        "total_images": (await run_io(storage.get_stats))['total_images']
     }
 
 @app.post("/api/images/curate")
 async def curate_images(top_n: int = 50):
     """Curate top N images"""
-    images = storage.get_images()
+    images = await run_io(storage.get_images)
     
     if len(images) == 0:
         raise HTTPException(404, "No images uploaded yet")
     
-    curated = ai_processor.curate_images(images, top_n)
+    scored = await run_inference(ai_processor.score_images, images)
+    await run_io(storage.update_images, {
+        img['id']: {"importance_score": img['importance_score']} for img in scored
+    })
+    curated = sorted(scored, key=lambda img: img['importance_score'], reverse=True)[:top_n]
     
     return {
         "message": f"Curated top {len(curated)} images",
@@ -142,23 +267,77 @@ async def curate_images(top_n: int = 50):
 @app.get("/api/images/stats")
 async def get_stats():
     """Get statistics"""
-    return storage.get_stats()
+    return await run_io(storage.get_stats)
+
+@app.get("/api/models/status")
+async def get_models_status():
+    """Loaded models, their resident memory and load times, offline bundles"""
+    return {
+        **ai_processor.registry.status(),
+        "bundles": bundle_info(ai_processor.models_dir)
+    }
+
+@app.get("/api/inference/metrics")
+async def get_inference_metrics():
+    """Queue depth, batch size histogram and latency percentiles per model"""
+    return broker.metrics()
+
+@app.get("/api/inference/cascade")
+async def get_cascade_stats():
+    """How often the pre-filter let each stage run or skipped it"""
+    return ai_processor.cascade_stats.snapshot()
 
 # ==================== GALLERY ====================
 
 @app.get("/api/gallery/timeline")
-async def get_timeline():
-    """Get timeline of all images"""
-    images = storage.get_images()
+async def get_timeline(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Get one page of the timeline (keyset pagination)
+    
+    Pass the returned next_cursor to get the following page; it is null
+    on the last page. total is only computed for the first page.
+    """
+    page_size = clamp_page_size(limit)
+    after_id = decode_cursor(cursor)[1] if cursor else 0
+    images = await run_io(storage.get_images_after, after_id, page_size)
+    
+    next_cursor = None
+    if len(images) == page_size:
+        last = images[-1]
+        next_cursor = encode_cursor(last.get('uploaded_at'), last['id'])
+    
+    total = None
+    if cursor is None:
+        total = (await run_io(storage.get_stats))['total_images']
+    
     return {
-        "total": len(images),
-        "timeline": images
+        "total": total,
+        "count": len(images),
+        "timeline": images,
+        "next_cursor": next_cursor
     }
 
+@app.get("/api/gallery/timeline/stream")
+async def stream_timeline():
+    """Stream the whole timeline as NDJSON, one image per line"""
+    # First page before the 200 goes out: a vault that is still loading
+    # (or failed to load) answers 503/500 instead of a broken stream
+    first_page = await run_io(storage.get_images_after, 0, DEFAULT_PAGE_SIZE)
+    
+    # Sync generator: Starlette iterates it in its threadpool, off the loop
+    def rows():
+        page = first_page
+        while page:
+            for img in page:
+                yield json.dumps(img, ensure_ascii=False) + "\n"
+            page = storage.get_images_after(page[-1]['id'], DEFAULT_PAGE_SIZE)
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
 @app.get("/api/gallery/highlights")
 async def get_highlights(limit: int = 20):
     """Get highlight images"""
-    highlights = storage.get_top_images(limit)
+    highlights = await run_io(storage.get_top_images, limit)
     return {
         "count": len(highlights),
         "highlights": highlights
@@ -167,7 +346,7 @@ async def get_highlights(limit: int = 20):
 @app.get("/api/gallery/by-emotion/{emotion}")
 async def get_by_emotion(emotion: str):
     """Get images by emotion"""
-    images = storage.get_images_by_emotion(emotion)
+    images = await run_io(storage.get_images_by_emotion, emotion)
     return {
         "emotion": emotion,
         "count": len(images),
@@ -188,7 +367,7 @@ async def train_style(
         raise HTTPException(400, "Need at least 5 images")
     
     # Save model info
-    model_data = storage.add_style_model({
+    model_data = await run_io(storage.add_style_model, {
         "name": name,
         "description": description,
         "style_prompt": style_prompt,
@@ -209,18 +388,18 @@ async def generate_in_style(
     num_images: int = 1
 ):
     """Generate images in style"""
-    model = storage.get_style_model(model_id)
+    model = await run_io(storage.get_style_model, model_id)
     if not model:
         raise HTTPException(404, "Model not found")
     
     results = []
     for i in range(num_images):
         full_prompt = f"{prompt}, {model['style_prompt']}"
-        image = ai_processor.generate_image(full_prompt)
+        image = await run_inference(ai_processor.generate_image, full_prompt)
         
         if image:
             output_path = f"output/generated_{model_id}_{i}.png"
-            image.save(output_path)
+            await run_io(image.save, output_path)
             results.append(output_path)
     
     return {
@@ -231,7 +410,7 @@ async def generate_in_style(
 @app.get("/api/style/models")
 async def list_models():
     """List style models"""
-    models = storage.get_style_models()
+    models = await run_io(storage.get_style_models)
     return {
         "total": len(models),
         "models": models
@@ -242,19 +421,20 @@ async def list_models():
 @app.post("/api/life-reel/create")
 async def create_life_reel(background_tasks: BackgroundTasks):
     """Create life reel"""
-    images = storage.get_top_images(20)
+    images = await run_io(storage.get_top_images, 20)
     
     if len(images) == 0:
         raise HTTPException(404, "No images available")
     
-    job = storage.add_job({
+    # Journal writes wait for an fsync: keep them off the event loop
+    job = await run_io(storage.add_job, {
         "status": "processing",
         "total_images": len(images)
     })
     
     # In real implementation, process in background
     # For now, mark as completed
-    storage.update_job(job['id'], {
+    await run_io(storage.update_job, job['id'], {
         "status": "completed",
         "output_path": f"output/life_reel_{job['id']}.mp4"
     })
@@ -268,7 +448,7 @@ async def create_life_reel(background_tasks: BackgroundTasks):
 @app.get("/api/life-reel/status/{job_id}")
 async def get_job_status(job_id: int):
     """Get job status"""
-    job = storage.get_job(job_id)
+    job = await run_io(storage.get_job, job_id)
     if not job:
         raise HTTPException(404, "Job not found")
     
@@ -1,25 +1,158 @@
 """
 Simple JSON-based storage (no SQLAlchemy needed)
 Python 3.14 compatible
+
+Mutations are appended to a write-ahead journal (``data.json.journal``)
+and the full ``data.json`` snapshot is only rewritten on compaction, once
+the journal reaches ``compact_ratio`` of the snapshot size. Compaction
+serialises a copy of the state in a background thread, so readers and
+writers are only held up while the copy is taken. Writers that arrive
+within ``commit_window`` share one flush + fsync.
+
+The snapshot is loaded in a background thread so the server can start
+answering (``ready`` is False until then); every other method waits for
+the load. Snapshots keep one record per line, which lets the loader
+decode record by record with orjson when it is installed.
 """
+import bisect
+import functools
+import gc
 import json
 import os
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _loads(data):
+    """Decode JSON, with orjson when available"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _dumps(obj) -> bytes:
+    """Encode compact UTF-8 JSON, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class StorageNotReady(RuntimeError):
+    """The snapshot is still loading in the background (HTTP 503)"""
+
+def _after_load(method):
+    """Make a public method fail fast until the background snapshot load is done"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._check_loaded()
+        return method(self, *args, **kwargs)
+    return wrapper
+
 class SimpleStorage:
     """Simple JSON file storage"""
     
-    def __init__(self, db_path: str = "data.json"):
+    def __init__(
+        self,
+        db_path: str = "data.json",
+        journal: bool = True,
+        compact_ratio: float = 0.5,
+        compact_min_bytes: int = 4 * 1024 * 1024,
+        commit_window: float = 0.002,
+        background_load: bool = True
+    ):
+        """
+        Args:
+            db_path: Snapshot file
+            journal: Append mutations to a journal instead of rewriting the snapshot
+            compact_ratio: Compact once the journal reaches this fraction of the snapshot size
+            compact_min_bytes: ...but never while the journal is smaller than this
+            commit_window: Seconds a flush waits to batch concurrent writers
+            background_load: Load the snapshot in a thread instead of blocking here
+        """
         self.db_path = db_path
-        self.data = self._load()
+        self.journal_path = f"{db_path}.journal"
+        self.journal = journal
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.commit_window = commit_window
+        self._seq = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
+        self._journal_file = None
+        self._saved_stats = None
+        # _lock guards the in-memory state; _commit guards the pending batch.
+        # Always take _lock before _commit, never the other way round.
+        self._lock = threading.RLock()
+        self._commit = threading.Condition()
+        self._pending: List[bytes] = []
+        self._queued_seq = 0
+        self._durable_seq = 0
+        self._flushing = False
+        self._compacting = False
+        self._loaded = threading.Event()
+        self._load_error = None
+        if background_load:
+            threading.Thread(target=self._open, name="storage-load", daemon=True).start()
+        else:
+            self._open()
+    
+    @property
+    def ready(self) -> bool:
+        """True once the snapshot and journal are loaded"""
+        return self._loaded.is_set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the background load has finished (scripts, benchmarks)
+        
+        Never call this from the event loop: request handlers get
+        StorageNotReady instead and answer 503 while loading.
+        """
+        if not self._loaded.wait(timeout):
+            return False
+        self._check_loaded()
+        return True
+    
+    def _check_loaded(self):
+        """Raise unless the snapshot and journal are loaded"""
+        if not self._loaded.is_set():
+            raise StorageNotReady(f"{self.db_path} is still loading")
+        if self._load_error is not None:
+            raise RuntimeError(f"Failed to load {self.db_path}") from self._load_error
+    
+    def _open(self):
+        """Load snapshot, build indexes and replay the journal"""
+        # Full GC passes over the records being loaded stall every thread,
+        # /health included; records live for the whole process anyway.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.data = self._load()
+            self._build_indexes()
+            if self.journal:
+                self._replay()
+            self._queued_seq = self._durable_seq = self._seq
+        except BaseException as e:
+            self._load_error = e
+        finally:
+            if gc_enabled:
+                gc.freeze()
+                gc.enable()
+            self._loaded.set()
     
     def _load(self) -> Dict:
         """Load data from JSON file"""
         if os.path.exists(self.db_path):
             try:
-                with open(self.db_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(self.db_path, 'rb') as f:
+                    data = self._read_snapshot(f)
+                self._snapshot_bytes = os.path.getsize(self.db_path)
+                self._seq = data.pop('_journal_seq', 0)
+                self._saved_stats = data.pop('_stats', None)
+                for collection in ("images", "style_models", "life_reel_jobs"):
+                    data.setdefault(collection, [])
+                return data
             except:
                 pass
         return {
@@ -28,112 +161,463 @@ class SimpleStorage:
             "life_reel_jobs": []
         }
     
+    @staticmethod
+    def _read_snapshot(f) -> Dict:
+        """Decode a snapshot written by _save one record per line"""
+        data = {}
+        items = None
+        try:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if items is not None:
+                    if line in (b']', b'],'):
+                        items = None
+                    elif line:
+                        items.append(_loads(line.rstrip(b',')))
+                elif line.endswith(b': ['):
+                    items = data[_loads(line[:-3])] = []
+                elif line not in (b'{', b'}'):
+                    key, _, value = line.partition(b': ')
+                    data[_loads(key)] = _loads(value.rstrip(b','))
+        except ValueError:
+            # Pretty-printed snapshot from an older version
+            f.seek(0)
+            data = _loads(f.read())
+        return data
+    
+    def _replay(self):
+        """Re-apply journal records newer than the snapshot"""
+        if not os.path.exists(self.journal_path):
+            return
+        
+        good_offset = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    # Torn write at the tail of the journal
+                    break
+                good_offset += len(line)
+                if record['seq'] <= self._seq:
+                    continue
+                self._apply(record)
+                self._seq = record['seq']
+        
+        if good_offset < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+        self._journal_bytes = good_offset
+    
+    def _apply(self, record: Dict):
+        """Apply one journal record to the in-memory state"""
+        if record['op'] == 'add':
+            self._insert(record['collection'], record['item'])
+        elif record['op'] == 'update':
+            self._modify(record['collection'], record['id'], record['updates'])
+    
+    def _build_indexes(self):
+        """Build id -> record maps, the emotion index, the importance order and stats counters"""
+        self._by_id = {
+            collection: {item['id']: item for item in items}
+            for collection, items in self.data.items()
+        }
+        self._by_emotion = {}
+        for img in self.data['images']:
+            self._by_emotion.setdefault(img.get('emotion'), {})[img['id']] = img
+        # Sorted (-importance_score, id) keys: ties keep upload order like sorted().
+        # The id -> key map is what _modify removes, even if a caller mutated a record.
+        self._importance_keys = {
+            img['id']: self._importance_key(img) for img in self.data['images']
+        }
+        self._by_importance = sorted(self._importance_keys.values())
+        # Older snapshots counted no-face images under 'unknown': recount those
+        saved = self._saved_stats
+        if saved is not None and 'unknown' not in saved['emotions']:
+            self._emotion_counts = saved['emotions']
+        else:
+            self._emotion_counts = {}
+            for img in self.data['images']:
+                self._count_emotion(img, 1)
+    
+    def _count_emotion(self, img: Dict, delta: int):
+        """Adjust the running per-emotion counter (no-face images are not counted)"""
+        emotion = img.get('emotion')
+        if emotion is None:
+            return
+        # Replaced rather than mutated: get_stats and compaction read it without _lock
+        counts = dict(self._emotion_counts)
+        count = counts.get(emotion, 0) + delta
+        if count:
+            counts[emotion] = count
+        else:
+            counts.pop(emotion, None)
+        self._emotion_counts = counts
+    
+    @staticmethod
+    def _importance_key(img: Dict):
+        """Sort key for the importance index"""
+        return (-(img.get('importance_score') or 0), img['id'])
+    
+    def _insert(self, collection: str, item: Dict):
+        """Append a record and index it"""
+        self.data[collection].append(item)
+        self._by_id[collection][item['id']] = item
+        if collection == 'images':
+            self._by_emotion.setdefault(item.get('emotion'), {})[item['id']] = item
+            key = self._importance_key(item)
+            self._importance_keys[item['id']] = key
+            bisect.insort(self._by_importance, key)
+            self._count_emotion(item, 1)
+    
+    def _modify(self, collection: str, item_id: int, updates: Dict) -> Optional[Dict]:
+        """
+        Replace a record with an updated copy and keep the indexes in sync
+        
+        Records are never mutated in place, so compaction can serialise a
+        shallow copy of the lists outside _lock.
+        """
+        item = self._by_id[collection].get(item_id)
+        if item is None:
+            return None
+        
+        updated = {**item, **updates}
+        items = self.data[collection]
+        # Ids are assigned as len + 1 and records are never deleted
+        index = item_id - 1
+        if not (0 <= index < len(items) and items[index] is item):
+            index = next(i for i, record in enumerate(items) if record is item)
+        items[index] = updated
+        self._by_id[collection][item_id] = updated
+        if collection != 'images':
+            return updated
+        
+        if 'importance_score' in updates:
+            key = self._importance_keys[item_id]
+            del self._by_importance[bisect.bisect_left(self._by_importance, key)]
+            key = self._importance_key(updated)
+            self._importance_keys[item_id] = key
+            bisect.insort(self._by_importance, key)
+        self._by_emotion.get(item.get('emotion'), {}).pop(item_id, None)
+        self._by_emotion.setdefault(updated.get('emotion'), {})[item_id] = updated
+        if 'emotion' in updates:
+            self._count_emotion(item, -1)
+            self._count_emotion(updated, 1)
+        return updated
+    
     def _save(self):
-        """Save data to JSON file"""
-        with open(self.db_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """Save data to JSON file (caller holds _lock)"""
+        self._write_snapshot(self.data, self._emotion_counts, self._seq)
+    
+    def _write_snapshot(self, data: Dict, emotion_counts: Dict, seq: int):
+        """Write a snapshot covering mutations up to ``seq`` (atomic rename)"""
+        tmp_path = f"{self.db_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b'{\n"_journal_seq": %d,\n' % seq)
+            f.write(b'"_stats": ' + _dumps({"emotions": emotion_counts}) + b',\n')
+            for n, (collection, items) in enumerate(data.items()):
+                f.write(_dumps(collection) + b': [\n')
+                for i, item in enumerate(items):
+                    f.write(_dumps(item) + (b',\n' if i < len(items) - 1 else b'\n'))
+                f.write(b'],\n' if n < len(data) - 1 else b']\n')
+            f.write(b'}\n')
+            f.flush()
+            os.fsync(f.fileno())
+            self._snapshot_bytes = f.tell()
+        os.replace(tmp_path, self.db_path)
+    
+    def _log(self, record: Dict) -> int:
+        """Queue a mutation that has already been applied in memory (caller holds _lock)"""
+        self._seq += 1
+        record['seq'] = self._seq
+        line = _dumps(record) + b"\n"
+        with self._commit:
+            self._pending.append(line)
+            self._queued_seq = self._seq
+        return self._seq
+    
+    def _sync(self, seq: int):
+        """Block until mutation ``seq`` is durable (caller must not hold _lock)"""
+        with self._commit:
+            while self._durable_seq < seq:
+                if self._flushing:
+                    self._commit.wait()
+                else:
+                    self._flush()
+    
+    def _flush(self):
+        """Group commit: write every pending record with a single fsync (caller holds _commit)"""
+        self._flushing = True
+        try:
+            if self.commit_window:
+                # Let writers that arrive in the meantime join this batch
+                self._commit.wait(self.commit_window)
+            batch, self._pending = self._pending, []
+            batch_seq = self._queued_seq
+            needs_compact = False
+            self._commit.release()
+            try:
+                if not self.journal:
+                    with self._lock:
+                        batch_seq = self._seq
+                        self._save()
+                elif batch:
+                    self._append(batch)
+                    needs_compact = self._journal_bytes >= max(
+                        self.compact_min_bytes, self._snapshot_bytes * self.compact_ratio
+                    )
+            finally:
+                self._commit.acquire()
+            self._durable_seq = max(self._durable_seq, batch_seq)
+        finally:
+            self._flushing = False
+            self._commit.notify_all()
+        
+        if needs_compact and not self._compacting:
+            # Off the writer's thread: its batch is already durable
+            self._compacting = True
+            threading.Thread(
+                target=self._run_compaction, name="storage-compact", daemon=True
+            ).start()
+    
+    def _append(self, batch: List[bytes]):
+        """Append a batch of records to the journal and fsync once"""
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, 'ab')
+        self._journal_file.write(b"".join(batch))
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+        self._journal_bytes += sum(len(line) for line in batch)
+    
+    @_after_load
+    def compact(self):
+        """Write a fresh snapshot and drop the journal records it covers"""
+        with self._commit:
+            while self._compacting:
+                self._commit.wait()
+            self._compacting = True
+        self._run_compaction()
+    
+    def _run_compaction(self):
+        """Body of compact(); the caller has set _compacting"""
+        try:
+            self._compact()
+        except Exception as e:
+            # The journal still holds every record, nothing is lost
+            print(f"Compaction of {self.db_path} failed: {e}")
+        finally:
+            with self._commit:
+                self._compacting = False
+                self._commit.notify_all()
+    
+    def _compact(self):
+        if not self.journal:
+            with self._lock:
+                self._save()
+            return
+        
+        # 1. Copy the state. Records are replaced, never mutated (see
+        #    _modify), so shallow copies of the lists are a consistent view.
+        with self._lock:
+            data = {collection: list(items) for collection, items in self.data.items()}
+            emotion_counts = self._emotion_counts
+            snapshot_seq = self._seq
+            with self._commit:
+                while self._flushing:
+                    self._commit.wait()
+                # Every record appended so far has seq <= snapshot_seq
+                journal_offset = self._journal_bytes
+        
+        # 2. Serialise and fsync while readers and writers carry on
+        self._write_snapshot(data, emotion_counts, snapshot_seq)
+        
+        # 3. Swap in a journal holding only what was appended since the copy.
+        #    A crash before the rename leaves the old journal, whose covered
+        #    records replay skips by seq.
+        with self._commit:
+            while self._flushing:
+                self._commit.wait()
+            self._flushing = True
+        try:
+            tail = b""
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(journal_offset)
+                    tail = f.read()
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+            os.replace(tmp_path, self.journal_path)
+            self._journal_bytes = len(tail)
+        finally:
+            with self._commit:
+                self._flushing = False
+                self._commit.notify_all()
+    
+    @_after_load
+    def close(self):
+        """Close the journal file handle"""
+        with self._commit:
+            while self._flushing or self._compacting:
+                self._commit.wait()
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
     
     # Images
+    @_after_load
     def add_image(self, image_data: Dict) -> Dict:
         """Add image record"""
-        image_data['id'] = len(self.data['images']) + 1
-        image_data['uploaded_at'] = datetime.now().isoformat()
-        self.data['images'].append(image_data)
-        self._save()
+        with self._lock:
+            image_data['id'] = len(self.data['images']) + 1
+            image_data['uploaded_at'] = datetime.now().isoformat()
+            self._insert('images', image_data)
+            seq = self._log({"op": "add", "collection": "images", "item": image_data})
+        self._sync(seq)
         return image_data
     
+    @_after_load
     def get_images(self) -> List[Dict]:
         """Get all images"""
         return self.data['images']
     
+    @_after_load
+    def get_images_after(self, after_id: int = 0, limit: int = 200) -> List[Dict]:
+        """Get the next `limit` images with id > after_id, in upload order"""
+        with self._lock:
+            images = self.data['images']
+            # The list is append-only, so it is sorted by id
+            start = bisect.bisect_right(images, after_id, key=lambda img: img['id'])
+            return images[start:start + limit]
+    
+    @_after_load
     def get_image(self, image_id: int) -> Optional[Dict]:
         """Get image by ID"""
-        for img in self.data['images']:
-            if img['id'] == image_id:
-                return img
-        return None
+        return self._by_id['images'].get(image_id)
     
+    @_after_load
     def update_image(self, image_id: int, updates: Dict):
         """Update image"""
-        for img in self.data['images']:
-            if img['id'] == image_id:
-                img.update(updates)
-                self._save()
-                return img
-        return None
+        with self._lock:
+            img = self._modify('images', image_id, updates)
+            if img is None:
+                return None
+            seq = self._log({"op": "update", "collection": "images", "id": image_id, "updates": updates})
+        self._sync(seq)
+        return img
     
+    @_after_load
+    def update_images(self, updates: Dict[int, Dict]) -> List[Dict]:
+        """Update many images, made durable by a single journal fsync"""
+        images = []
+        seq = 0
+        with self._lock:
+            for image_id, changes in updates.items():
+                img = self._modify('images', image_id, changes)
+                if img is None:
+                    continue
+                images.append(img)
+                seq = self._log({"op": "update", "collection": "images", "id": image_id, "updates": changes})
+        if seq:
+            self._sync(seq)
+        return images
+    
+    @_after_load
     def get_images_by_emotion(self, emotion: str) -> List[Dict]:
         """Get images by emotion"""
-        return [img for img in self.data['images'] if img.get('emotion') == emotion]
+        with self._lock:
+            matches = self._by_emotion.get(emotion, {})
+            # Records re-tagged by update_image are appended out of id order
+            return [matches[image_id] for image_id in sorted(matches)]
     
+    @_after_load
     def get_top_images(self, limit: int = 20) -> List[Dict]:
         """Get top images by importance"""
-        sorted_images = sorted(
-            self.data['images'],
-            key=lambda x: x.get('importance_score', 0),
-            reverse=True
-        )
-        return sorted_images[:limit]
+        with self._lock:
+            images = self._by_id['images']
+            return [images[image_id] for _, image_id in self._by_importance[:limit]]
     
     # Style Models
+    @_after_load
     def add_style_model(self, model_data: Dict) -> Dict:
         """Add style model"""
-        model_data['id'] = len(self.data['style_models']) + 1
-        model_data['created_at'] = datetime.now().isoformat()
-        self.data['style_models'].append(model_data)
-        self._save()
+        with self._lock:
+            model_data['id'] = len(self.data['style_models']) + 1
+            model_data['created_at'] = datetime.now().isoformat()
+            self._insert('style_models', model_data)
+            seq = self._log({"op": "add", "collection": "style_models", "item": model_data})
+        self._sync(seq)
         return model_data
     
+    @_after_load
     def get_style_models(self) -> List[Dict]:
         """Get all style models"""
         return self.data['style_models']
     
+    @_after_load
     def get_style_model(self, model_id: int) -> Optional[Dict]:
         """Get style model by ID"""
-        for model in self.data['style_models']:
-            if model['id'] == model_id:
-                return model
-        return None
+        return self._by_id['style_models'].get(model_id)
     
     # Life Reel Jobs
+    @_after_load
     def add_job(self, job_data: Dict) -> Dict:
         """Add life reel job"""
-        job_data['id'] = len(self.data['life_reel_jobs']) + 1
-        job_data['created_at'] = datetime.now().isoformat()
-        self.data['life_reel_jobs'].append(job_data)
-        self._save()
+        with self._lock:
+            job_data['id'] = len(self.data['life_reel_jobs']) + 1
+            job_data['created_at'] = datetime.now().isoformat()
+            self._insert('life_reel_jobs', job_data)
+            seq = self._log({"op": "add", "collection": "life_reel_jobs", "item": job_data})
+        self._sync(seq)
         return job_data
     
+    @_after_load
     def update_job(self, job_id: int, updates: Dict):
         """Update job"""
-        for job in self.data['life_reel_jobs']:
-            if job['id'] == job_id:
-                job.update(updates)
-                self._save()
-                return job
-        return None
+        with self._lock:
+            job = self._modify('life_reel_jobs', job_id, updates)
+            if job is None:
+                return None
+            seq = self._log({"op": "update", "collection": "life_reel_jobs", "id": job_id, "updates": updates})
+        self._sync(seq)
+        return job
     
+    @_after_load
     def get_job(self, job_id: int) -> Optional[Dict]:
         """Get job by ID"""
-        for job in self.data['life_reel_jobs']:
-            if job['id'] == job_id:
-                return job
-        return None
+        return self._by_id['life_reel_jobs'].get(job_id)
     
     # Stats
+    @_after_load
     def get_stats(self) -> Dict:
-        """Get statistics"""
-        emotions = {}
-        for img in self.data['images']:
-            emotion = img.get('emotion', 'unknown')
-            emotions[emotion] = emotions.get(emotion, 0) + 1
-        
+        """Get statistics (from the running counters, never waits on _lock)"""
+        data = self.data
         return {
-            "total_images": len(self.data['images']),
-            "total_models": len(self.data['style_models']),
-            "total_jobs": len(self.data['life_reel_jobs']),
-            "emotions": emotions
+            "total_images": len(data['images']),
+            "total_models": len(data['style_models']),
+            "total_jobs": len(data['life_reel_jobs']),
+            "emotions": dict(self._emotion_counts)
         }
 
+def create_storage():
+    """
+    Build the storage engine selected by the environment
+    
+    STORAGE_ENGINE: "json" (default) or "sqlite"
+    STORAGE_PATH: data file, defaults to data.json / data.db
+    """
+    engine = os.getenv("STORAGE_ENGINE", "json").lower()
+    if engine == "sqlite":
+        from storage_sqlite import SQLiteStorage
+        return SQLiteStorage(os.getenv("STORAGE_PATH", "data.db"))
+    if engine != "json":
+        raise ValueError(f"Unknown STORAGE_ENGINE: {engine}")
+    return SimpleStorage(os.getenv("STORAGE_PATH", "data.json"))
+
 # Global storage instance
-storage = SimpleStorage()
+storage = create_storage()
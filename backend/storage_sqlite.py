@@ -0,0 +1,461 @@
+"""
+SQLite storage engine with the same API as SimpleStorage
+Python 3.14 compatible (stdlib sqlite3 only)
+
+Select it with STORAGE_ENGINE=sqlite (see storage_simple.create_storage).
+Migrate an existing vault with:
+    python storage_sqlite.py data.json data.db
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    emotion TEXT,
+    importance_score REAL NOT NULL DEFAULT 0,
+    uploaded_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_emotion ON images (emotion);
+CREATE INDEX IF NOT EXISTS idx_images_importance ON images (importance_score DESC, id);
+
+CREATE TABLE IF NOT EXISTS style_models (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS life_reel_jobs (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS emotion_counts (
+    emotion TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS collection_counts (
+    collection TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+"""
+
+COLLECTIONS = ("images", "style_models", "life_reel_jobs")
+
+class SQLiteStorage:
+    """SQLite (WAL) storage, drop-in replacement for SimpleStorage"""
+    
+    def __init__(self, db_path: str = "data.db"):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Older databases counted no-face images under 'unknown'
+        self._conn.execute("DELETE FROM emotion_counts WHERE emotion = 'unknown'")
+        # Older databases have no running totals yet: count once, then keep them up to date
+        counted = {row[0] for row in self._conn.execute("SELECT collection FROM collection_counts")}
+        for collection in COLLECTIONS:
+            if collection not in counted:
+                self._conn.execute(
+                    f"INSERT INTO collection_counts (collection, count) "
+                    f"SELECT ?, COUNT(*) FROM {collection}",
+                    (collection,)
+                )
+    
+    @property
+    def ready(self) -> bool:
+        """SQLite opens lazily, so the engine is always ready"""
+        return True
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Same API as SimpleStorage.wait_until_ready"""
+        return True
+    
+    @staticmethod
+    def _row_to_record(row: Tuple) -> Dict:
+        """(id, data) row -> record dict"""
+        record = json.loads(row[1])
+        record['id'] = row[0]
+        return record
+    
+    @staticmethod
+    def _stats_key(record: Dict) -> Optional[str]:
+        """Key used for the emotion counters (matches SimpleStorage.get_stats)"""
+        return record.get('emotion')
+    
+    def _count_emotion(self, emotion: Optional[str], delta: int):
+        """Adjust the running per-emotion counter (caller holds a transaction)"""
+        if emotion is None:
+            return  # no-face images are not counted
+        self._conn.execute(
+            "INSERT INTO emotion_counts (emotion, count) VALUES (?, ?) "
+            "ON CONFLICT (emotion) DO UPDATE SET count = count + excluded.count",
+            (emotion, delta)
+        )
+        self._conn.execute("DELETE FROM emotion_counts WHERE emotion = ? AND count = 0", (emotion,))
+    
+    def _count_record(self, collection: str):
+        """Bump the running total of a collection (caller holds a transaction)"""
+        self._conn.execute(
+            "UPDATE collection_counts SET count = count + 1 WHERE collection = ?", (collection,)
+        )
+    
+    def _insert(self, collection: str, item: Dict) -> int:
+        """Insert a record, keeping item['id'] if present (caller holds a transaction)"""
+        data = json.dumps({k: v for k, v in item.items() if k != 'id'}, ensure_ascii=False)
+        if collection == 'images':
+            cursor = self._conn.execute(
+                "INSERT INTO images (id, emotion, importance_score, uploaded_at, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (item.get('id'), item.get('emotion'), item.get('importance_score') or 0,
+                 item.get('uploaded_at'), data)
+            )
+            self._count_emotion(self._stats_key(item), 1)
+        else:
+            cursor = self._conn.execute(
+                f"INSERT INTO {collection} (id, data) VALUES (?, ?)",
+                (item.get('id'), data)
+            )
+        self._count_record(collection)
+        return cursor.lastrowid
+    
+    def _modify(self, collection: str, item_id: int, updates: Dict) -> Optional[Dict]:
+        """Merge updates into a stored record (caller holds a transaction)"""
+        row = self._conn.execute(
+            f"SELECT id, data FROM {collection} WHERE id = ?", (item_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        item = self._row_to_record(row)
+        old_key = self._stats_key(item)
+        item.update(updates)
+        item['id'] = item_id
+        data = json.dumps({k: v for k, v in item.items() if k != 'id'}, ensure_ascii=False)
+        
+        if collection == 'images':
+            self._conn.execute(
+                "UPDATE images SET emotion = ?, importance_score = ?, uploaded_at = ?, data = ? "
+                "WHERE id = ?",
+                (item.get('emotion'), item.get('importance_score') or 0,
+                 item.get('uploaded_at'), data, item_id)
+            )
+            if self._stats_key(item) != old_key:
+                self._count_emotion(old_key, -1)
+                self._count_emotion(self._stats_key(item), 1)
+        else:
+            self._conn.execute(
+                f"UPDATE {collection} SET data = ? WHERE id = ?", (data, item_id)
+            )
+        return item
+    
+    def _add(self, collection: str, item: Dict, timestamp_field: str) -> Dict:
+        """Shared body of add_image / add_style_model / add_job"""
+        item.pop('id', None)
+        item[timestamp_field] = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                item['id'] = self._insert(collection, item)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return item
+    
+    def _update(self, collection: str, item_id: int, updates: Dict) -> Optional[Dict]:
+        """Shared body of update_image / update_job"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                item = self._modify(collection, item_id, updates)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return item
+    
+    def _get(self, collection: str, item_id: int) -> Optional[Dict]:
+        """Point lookup by primary key"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT id, data FROM {collection} WHERE id = ?", (item_id,)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+    
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        """Run a (id, data) query and decode the rows"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_record(row) for row in rows]
+    
+    def compact(self):
+        """Checkpoint the WAL back into the main database file"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    # Images
+    def add_image(self, image_data: Dict) -> Dict:
+        """Add image record"""
+        return self._add('images', image_data, 'uploaded_at')
+    
+    def get_images(self) -> List[Dict]:
+        """Get all images"""
+        return self._query("SELECT id, data FROM images ORDER BY id")
+    
+    def get_images_after(self, after_id: int = 0, limit: int = 200) -> List[Dict]:
+        """Get the next `limit` images with id > after_id, in upload order"""
+        return self._query(
+            "SELECT id, data FROM images WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+    
+    def get_image(self, image_id: int) -> Optional[Dict]:
+        """Get image by ID"""
+        return self._get('images', image_id)
+    
+    def update_image(self, image_id: int, updates: Dict):
+        """Update image"""
+        return self._update('images', image_id, updates)
+    
+    def update_images(self, updates: Dict[int, Dict]) -> List[Dict]:
+        """Update many images in a single transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                images = [self._modify('images', image_id, changes) for image_id, changes in updates.items()]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [img for img in images if img is not None]
+    
+    def get_images_by_emotion(self, emotion: str) -> List[Dict]:
+        """Get images by emotion"""
+        return self._query(
+            "SELECT id, data FROM images WHERE emotion = ? ORDER BY id", (emotion,)
+        )
+    
+    def get_top_images(self, limit: int = 20) -> List[Dict]:
+        """Get top images by importance"""
+        return self._query(
+            "SELECT id, data FROM images ORDER BY importance_score DESC, id LIMIT ?", (limit,)
+        )
+    
+    # Style Models
+    def add_style_model(self, model_data: Dict) -> Dict:
+        """Add style model"""
+        return self._add('style_models', model_data, 'created_at')
+    
+    def get_style_models(self) -> List[Dict]:
+        """Get all style models"""
+        return self._query("SELECT id, data FROM style_models ORDER BY id")
+    
+    def get_style_model(self, model_id: int) -> Optional[Dict]:
+        """Get style model by ID"""
+        return self._get('style_models', model_id)
+    
+    # Life Reel Jobs
+    def add_job(self, job_data: Dict) -> Dict:
+        """Add life reel job"""
+        return self._add('life_reel_jobs', job_data, 'created_at')
+    
+    def update_job(self, job_id: int, updates: Dict):
+        """Update job"""
+        return self._update('life_reel_jobs', job_id, updates)
+    
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """Get job by ID"""
+        return self._get('life_reel_jobs', job_id)
+    
+    # Stats
+    def get_stats(self) -> Dict:
+        """Get statistics (from the running counters, no table scans)"""
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT collection, count FROM collection_counts"))
+            emotions = dict(self._conn.execute("SELECT emotion, count FROM emotion_counts"))
+        
+        return {
+            "total_images": totals['images'],
+            "total_models": totals['style_models'],
+            "total_jobs": totals['life_reel_jobs'],
+            "emotions": emotions
+        }
+
+# ==================== MIGRATION ====================
+
+def _iter_snapshot(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, object]]:
+    """
+    Stream a SimpleStorage snapshot without loading it whole
+    
+    Yields (key, element) for every element of the top-level lists and
+    (key, value) for scalar top-level values such as _journal_seq.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ""
+        pos = 0
+        eof = False
+        
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+        
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+        
+        def expect(chars: str) -> str:
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buf) or buf[pos] not in chars:
+                raise ValueError(f"Expected one of {chars!r} at offset {pos}")
+            pos += 1
+            return buf[pos - 1]
+        
+        def peek() -> str:
+            skip_ws()
+            return buf[pos] if pos < len(buf) else ""
+        
+        def value():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    # A number cut at the chunk boundary still decodes, so
+                    # only trust a match that is followed by more input.
+                    if end < len(buf) or eof:
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+        
+        expect("{")
+        if peek() == "}":
+            return
+        while True:
+            key = value()
+            expect(":")
+            if peek() == "[":
+                expect("[")
+                if peek() == "]":
+                    expect("]")
+                else:
+                    while True:
+                        yield key, value()
+                        if expect(",]") == "]":
+                            break
+            else:
+                yield key, value()
+            if expect(",}") == "}":
+                return
+
+def _remove_database(path: str):
+    """Delete a database file together with its WAL side files"""
+    for name in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+
+def migrate_from_json(json_path: str, db_path: str, batch_size: int = 1000) -> Dict:
+    """
+    One-shot streaming migration of data.json (+ its journal) into SQLite
+    
+    Writes into ``<db_path>.migrating`` and renames it over db_path only
+    once everything is in, so a failed run leaves no half-migrated database
+    and can simply be re-run.
+    
+    Returns:
+        Number of migrated records per collection
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists, refusing to migrate into it")
+    
+    tmp_path = f"{db_path}.migrating"
+    _remove_database(tmp_path)
+    
+    migrated = {collection: 0 for collection in COLLECTIONS}
+    snapshot_seq = 0
+    storage = SQLiteStorage(tmp_path)
+    try:
+        conn = storage._conn
+        conn.execute("BEGIN IMMEDIATE")
+        if os.path.exists(json_path):
+            batch = 0
+            for key, item in _iter_snapshot(json_path):
+                if key == '_journal_seq':
+                    snapshot_seq = item
+                elif key in migrated:
+                    storage._insert(key, item)
+                    migrated[key] += 1
+                    batch += 1
+                    if batch >= batch_size:
+                        # Keeps the WAL bounded; the file is not visible until the rename
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN IMMEDIATE")
+                        batch = 0
+        
+        # Records appended after the last compaction
+        journal_path = f"{json_path}.journal"
+        if os.path.exists(journal_path):
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record['seq'] <= snapshot_seq:
+                        continue
+                    if record['op'] == 'add':
+                        storage._insert(record['collection'], record['item'])
+                        migrated[record['collection']] += 1
+                    elif record['op'] == 'update':
+                        storage._modify(record['collection'], record['id'], record['updates'])
+        conn.execute("COMMIT")
+        storage.compact()
+        storage.close()
+    except BaseException:
+        storage.close()
+        _remove_database(tmp_path)
+        raise
+    
+    os.replace(tmp_path, db_path)
+    return migrated
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python storage_sqlite.py <data.json> <data.db>")
+        sys.exit(1)
+    
+    source, target = sys.argv[1], sys.argv[2]
+    counts = migrate_from_json(source, target)
+    
+    print(f"✅ Migrated {source} -> {target}")
+    for collection, count in counts.items():
+        print(f"  - {collection}: {count}")
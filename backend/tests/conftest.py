@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import the backend modules the same way main_full_py314 does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# storage_simple builds its module-level store on import; keep it away from ./data.json
+os.environ.setdefault("STORAGE_PATH", os.path.join(tempfile.mkdtemp(), "data.json"))
@@ -0,0 +1,63 @@
+"""Accuracy drift of the int8 / onnx inference backends against float32 (ai/backends.py)"""
+import pytest
+
+torch = pytest.importorskip("torch")
+nn = torch.nn
+
+from ai.backends import build_runner, quantize_int8
+from ai.model_registry import resident_bytes
+
+# Same gate as benchmarks/bench_backends.py --min-cosine
+MIN_COSINE = 0.99
+
+def _tower():
+    """Small Linear-heavy stand-in for a vision tower (what dynamic int8 targets)"""
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Flatten(),
+        nn.Linear(3 * 32 * 32, 256),
+        nn.GELU(),
+        nn.Linear(256, 256),
+        nn.GELU(),
+        nn.Linear(256, 64)
+    ).eval()
+
+def _inputs():
+    torch.manual_seed(1)
+    return torch.randn(16, 3, 32, 32)
+
+def _min_cosine(a, b):
+    return nn.functional.cosine_similarity(a, b, dim=1).min().item()
+
+def test_int8_drift():
+    model = _tower()
+    x = _inputs()
+    runner = build_runner(model, "int8", x[:1])
+    with torch.no_grad():
+        assert _min_cosine(runner(x), model(x)) >= MIN_COSINE
+
+def test_onnx_drift(tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    model = _tower()
+    x = _inputs()
+    runner = build_runner(model, "onnx", x[:1], str(tmp_path / "tower.onnx"))
+    with torch.no_grad():
+        expected = model(x)
+        assert (runner(x) - expected).abs().max().item() < 1e-4
+        assert _min_cosine(runner(x), expected) >= MIN_COSINE
+
+def test_int8_inplace_drops_float_weights():
+    model = _tower()
+    float_bytes = resident_bytes(model)
+    quantized = quantize_int8(model, inplace=True)
+    assert quantized is model
+    # Packed int8 weights are counted, at roughly a quarter of the float32 size
+    assert 0 < resident_bytes(quantized) < float_bytes / 2
+
+def test_emotion_detector_rejects_int8():
+    pytest.importorskip("torchvision")
+    from ai.emotion_detector import EmotionDetector
+    
+    with pytest.raises(ValueError):
+        EmotionDetector(device="cpu", backend="int8")
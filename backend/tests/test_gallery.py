@@ -0,0 +1,169 @@
+"""api/routes/gallery.py trên SQLite (aiosqlite)"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.routes.gallery import get_by_emotion, get_highlights, get_timeline
+from db.database import Base
+from db.migrations import upgrade
+from db.models import ImageRecord
+
+def _run(coro):
+    return asyncio.run(coro)
+
+async def _session(path, timestamps):
+    """DB mới với một ảnh cho mỗi timestamp (None = server_default func.now())"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)()
+    for i, _ in enumerate(timestamps):
+        session.add(ImageRecord(filename=f"{i}.jpg", file_path=f"uploads/{i}.jpg"))
+    await session.commit()
+    for i, stamp in enumerate(timestamps, start=1):
+        if stamp is not None:
+            # Đúng định dạng SQLite lưu cho func.now()
+            await session.execute(
+                text("UPDATE images SET uploaded_at = :stamp WHERE id = :id"),
+                {"stamp": stamp, "id": i}
+            )
+    await session.commit()
+    return engine, session
+
+async def _all_pages(session, limit):
+    ids, cursor = [], None
+    while True:
+        page = await get_timeline(cursor=cursor, limit=limit, db=session)
+        ids.extend(entry["id"] for entry in page["timeline"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 50])
+def test_timeline_pages_through_identical_timestamps(tmp_path, limit):
+    async def scenario():
+        # 7 ảnh cùng một giây (upload hàng loạt) giữa hai ảnh khác giây
+        stamps = ["2024-05-01 11:59:59"] + ["2024-05-01 12:00:00"] * 7 + ["2024-05-01 12:00:01"]
+        engine, session = await _session(tmp_path / "gallery.db", stamps)
+        try:
+            return await _all_pages(session, limit)
+        finally:
+            await session.close()
+            await engine.dispose()
+    
+    assert _run(scenario()) == list(range(1, 10))
+
+def test_timeline_pages_through_server_default_timestamps(tmp_path):
+    async def scenario():
+        engine, session = await _session(tmp_path / "gallery.db", [None] * 7)
+        try:
+            return await _all_pages(session, 3)
+        finally:
+            await session.close()
+            await engine.dispose()
+    
+    assert _run(scenario()) == list(range(1, 8))
+
+def test_timeline_cursor_survives_deleted_anchor(tmp_path):
+    async def scenario():
+        stamps = [f"2024-05-01 12:00:0{i}" for i in range(6)]
+        engine, session = await _session(tmp_path / "gallery.db", stamps)
+        try:
+            first = await get_timeline(cursor=None, limit=3, db=session)
+            # Dòng cuối của trang 1 bị xóa trước khi client lấy trang 2
+            await session.execute(text("DELETE FROM images WHERE id = 3"))
+            await session.commit()
+            second = await get_timeline(cursor=first["next_cursor"], limit=3, db=session)
+            return [entry["id"] for entry in second["timeline"]]
+        finally:
+            await session.close()
+            await engine.dispose()
+    
+    assert _run(scenario()) == [4, 5, 6]
+
+def _query_plans(path, route):
+    """EXPLAIN QUERY PLAN của mọi SELECT mà route chạy trên DB ở path"""
+    async def capture():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        statements = []
+        
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+        
+        session = async_sessionmaker(bind=engine, class_=AsyncSession)()
+        try:
+            await route(session)
+        finally:
+            await session.close()
+            await engine.dispose()
+        return statements
+    
+    plans = []
+    sync_engine = create_engine(f"sqlite:///{path}")
+    with sync_engine.connect() as conn:
+        for statement, parameters in _run(capture()):
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append((statement, " | ".join(row[-1] for row in rows)))
+    sync_engine.dispose()
+    return plans
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """DB schema cũ (chưa có index) được nâng cấp bằng db.migrations"""
+    path = tmp_path / "plans.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for index in ImageRecord.__table__.indexes:
+            conn.exec_driver_sql(f"DROP INDEX {index.name}")
+        for i in range(50):
+            conn.exec_driver_sql(
+                "INSERT INTO images (filename, file_path, emotion, emotion_confidence, "
+                "importance_score, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (f"{i}.jpg", f"uploads/{i}.jpg", ["joy", "sadness"][i % 2], i / 50,
+                 (i * 7 % 50) / 50, "2024-05-01 12:00:00")
+            )
+    
+    created = upgrade(engine)
+    assert set(created) >= {
+        "ix_images_emotion_confidence", "ix_images_importance_score", "ix_images_uploaded_at_id"
+    }
+    assert upgrade(engine) == []  # idempotent
+    engine.dispose()
+    return path
+
+def _assert_uses_index(plans, index):
+    """Câu query chính dùng index và không sort bằng temp B-tree"""
+    main = [plan for statement, plan in plans if "count(" not in statement.lower()]
+    assert main, plans
+    for plan in main:
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+def test_timeline_uses_uploaded_at_index(migrated_db):
+    async def route(db):
+        first = await get_timeline(cursor=None, limit=10, db=db)
+        await get_timeline(cursor=first["next_cursor"], limit=10, db=db)
+    
+    plans = _query_plans(migrated_db, route)
+    _assert_uses_index(plans, "ix_images_uploaded_at_id")
+    # Trang sau seek vào index thay vì scan từ đầu
+    assert any("SEARCH" in plan and "uploaded_at>" in plan for _, plan in plans), plans
+
+def test_by_emotion_uses_emotion_index(migrated_db):
+    plans = _query_plans(migrated_db, lambda db: get_by_emotion("joy", db=db))
+    _assert_uses_index(plans, "ix_images_emotion_confidence")
+    assert all("(emotion=?)" in plan for _, plan in plans), plans
+
+def test_highlights_use_importance_index(migrated_db):
+    plans = _query_plans(migrated_db, lambda db: get_highlights(limit=20, db=db))
+    _assert_uses_index(plans, "ix_images_importance_score")
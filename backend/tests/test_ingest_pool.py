@@ -0,0 +1,33 @@
+"""IngestionPool: a dead worker process does not break later uploads"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from ingest_pool import IngestionPool
+
+class _LightPool(IngestionPool):
+    """Workers without the model-loading initializer"""
+    
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+def test_dead_worker_rebuilds_pool():
+    pool = _LightPool(1)
+    broken = pool._executor
+    # Worker killed (e.g. by the OOM killer) mid-task
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result(timeout=60)
+    
+    # Not an image: fails in the worker, but on a fresh pool
+    with pytest.raises(Exception) as info:
+        pool.submit(b"not an image").result(timeout=60)
+    assert not isinstance(info.value, BrokenProcessPool)
+    assert pool.restarts == 1
+    assert pool._executor is not broken
+    pool.close()
@@ -0,0 +1,108 @@
+"""
+Concurrency stress test for SimpleStorage (group commit + journal)
+
+Many threads add and update images at once; afterwards ids must be unique
+and dense, the counters must match the records, and a fresh instance
+replaying snapshot + journal must see exactly the same state.
+"""
+import threading
+
+import pytest
+
+from storage_simple import SimpleStorage
+
+WRITERS = 16
+WRITES_PER_WRITER = 200
+EMOTIONS = ["joy", "sadness", "anger", "neutral"]
+
+def _open(path, **kwargs):
+    return SimpleStorage(str(path), background_load=False, **kwargs)
+
+def _hammer(storage, writer, errors):
+    try:
+        for i in range(WRITES_PER_WRITER):
+            image = storage.add_image({
+                "filename": f"w{writer}-{i}.jpg",
+                "emotion": EMOTIONS[i % len(EMOTIONS)],
+                "importance_score": (i % 100) / 100
+            })
+            if i % 5 == 0:
+                storage.update_image(image["id"], {"emotion": "joy", "importance_score": 0.5})
+            if i % 50 == 0:
+                storage.get_stats()
+    except Exception as e:  # surfaced in the main thread
+        errors.append(e)
+
+def _run_writers(storage):
+    errors = []
+    threads = [
+        threading.Thread(target=_hammer, args=(storage, writer, errors))
+        for writer in range(WRITERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+@pytest.mark.parametrize("compact_min_bytes", [4 * 1024 * 1024, 16 * 1024])
+def test_concurrent_writers_lose_nothing(tmp_path, compact_min_bytes):
+    path = tmp_path / "data.json"
+    # Small floor: background compactions run while the writers are active
+    storage = _open(path, compact_min_bytes=compact_min_bytes)
+    _run_writers(storage)
+    
+    total = WRITERS * WRITES_PER_WRITER
+    images = storage.get_images()
+    ids = [image["id"] for image in images]
+    assert sorted(ids) == list(range(1, total + 1))
+    assert len({image["filename"] for image in images}) == total
+    
+    expected = {}
+    for image in images:
+        expected[image["emotion"]] = expected.get(image["emotion"], 0) + 1
+    stats = storage.get_stats()
+    assert stats["total_images"] == total
+    assert stats["emotions"] == expected
+    
+    storage.close()
+    replayed = _open(path)
+    assert replayed.get_images() == images
+    assert replayed.get_stats() == stats
+    assert [image["id"] for image in replayed.get_top_images(total)] == [
+        image["id"] for image in storage.get_top_images(total)
+    ]
+    replayed.close()
+
+def test_replay_after_compaction(tmp_path):
+    path = tmp_path / "data.json"
+    storage = _open(path)
+    _run_writers(storage)
+    storage.compact()
+    # Writes after the snapshot only live in the journal
+    storage.add_image({"filename": "after.jpg", "emotion": "sadness"})
+    storage.close()
+    
+    replayed = _open(path)
+    assert replayed.get_images() == storage.get_images()
+    assert replayed.get_stats() == storage.get_stats()
+    replayed.close()
+
+def test_bulk_update_keeps_importance_index(tmp_path):
+    path = tmp_path / "data.json"
+    storage = _open(path)
+    for i in range(5):
+        storage.add_image({"filename": f"{i}.jpg", "importance_score": 0})
+    # A caller scribbling on a returned record must not corrupt the index
+    storage.get_images()[4]["importance_score"] = 0.9
+    storage.update_images({image_id: {"importance_score": image_id / 10} for image_id in range(1, 5)})
+    storage.update_image(1, {"importance_score": 0.05})
+    
+    top = [image["id"] for image in storage.get_top_images(10)]
+    assert top == [4, 3, 2, 1, 5]
+    storage.close()
+    
+    replayed = _open(path)
+    assert [image["id"] for image in replayed.get_top_images(10)] == [4, 3, 2, 1, 5]
+    assert replayed.get_image(4)["importance_score"] == 0.4
+    replayed.close()
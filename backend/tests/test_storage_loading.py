@@ -0,0 +1,37 @@
+"""SimpleStorage background load: callers never block while it runs"""
+import threading
+
+import pytest
+
+from storage_simple import SimpleStorage, StorageNotReady
+
+def test_calls_fail_fast_while_loading(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    SimpleStorage(str(path), background_load=False).add_image({"emotion": "joy"})
+    
+    release = threading.Event()
+    original = SimpleStorage._load
+    def slow_load(self):
+        release.wait()
+        return original(self)
+    monkeypatch.setattr(SimpleStorage, "_load", slow_load)
+    
+    storage = SimpleStorage(str(path))
+    assert not storage.ready
+    with pytest.raises(StorageNotReady):
+        storage.get_stats()
+    assert not storage.wait_until_ready(timeout=0.01)
+    
+    release.set()
+    assert storage.wait_until_ready(timeout=5)
+    assert storage.get_stats()["total_images"] == 1
+    storage.close()
+
+def test_load_error_is_raised(tmp_path, monkeypatch):
+    def broken_load(self):
+        raise OSError("disk gone")
+    monkeypatch.setattr(SimpleStorage, "_load", broken_load)
+    storage = SimpleStorage(str(tmp_path / "data.json"))
+    with pytest.raises(RuntimeError) as info:
+        storage.wait_until_ready(timeout=5)
+    assert not isinstance(info.value, StorageNotReady)
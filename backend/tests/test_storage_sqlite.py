@@ -0,0 +1,77 @@
+"""SQLiteStorage: JSON -> SQLite migration and stats"""
+import pytest
+
+from storage_simple import SimpleStorage
+from storage_sqlite import SQLiteStorage, migrate_from_json
+
+def _json_vault(path, images=50):
+    storage = SimpleStorage(str(path), background_load=False)
+    for i in range(images):
+        storage.add_image({"filename": f"{i}.jpg", "emotion": "joy" if i % 2 else None})
+    storage.compact()
+    # Journal-only writes on top of the snapshot
+    storage.add_image({"filename": "late.jpg", "emotion": "sadness"})
+    storage.update_image(1, {"emotion": "anger"})
+    storage.close()
+    return storage
+
+def test_migration_matches_json_store(tmp_path):
+    source = _json_vault(tmp_path / "data.json")
+    counts = migrate_from_json(str(tmp_path / "data.json"), str(tmp_path / "data.db"))
+    assert counts["images"] == 51
+    
+    target = SQLiteStorage(str(tmp_path / "data.db"))
+    assert target.get_images() == source.get_images()
+    assert target.get_stats() == source.get_stats()
+    # No-face images (emotion None) are not counted
+    assert target.get_stats()["emotions"] == {"joy": 25, "anger": 1, "sadness": 1}
+    target.close()
+
+def test_failed_migration_leaves_nothing_behind(tmp_path, monkeypatch):
+    _json_vault(tmp_path / "data.json")
+    db_path = tmp_path / "data.db"
+    
+    def broken(self, collection, item):
+        if item.get("id") == 30:
+            raise RuntimeError("disk full")
+        return original(self, collection, item)
+    original = SQLiteStorage._insert
+    monkeypatch.setattr(SQLiteStorage, "_insert", broken)
+    with pytest.raises(RuntimeError):
+        migrate_from_json(str(tmp_path / "data.json"), str(db_path), batch_size=10)
+    assert sorted(p.name for p in tmp_path.iterdir() if "data.db" in p.name) == []
+    
+    # A re-run starts from scratch instead of hitting duplicate ids
+    monkeypatch.setattr(SQLiteStorage, "_insert", original)
+    assert migrate_from_json(str(tmp_path / "data.json"), str(db_path))["images"] == 51
+
+def test_migration_refuses_existing_database(tmp_path):
+    SQLiteStorage(str(tmp_path / "data.db")).close()
+    with pytest.raises(FileExistsError):
+        migrate_from_json(str(tmp_path / "data.json"), str(tmp_path / "data.db"))
+
+def test_stats_count_rows(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "data.db"))
+    # Explicit ids leave gaps, so MAX(id) would over-count
+    storage._insert("images", {"id": 10, "emotion": "joy"})
+    storage.add_image({"emotion": "joy"})
+    stats = storage.get_stats()
+    assert stats["total_images"] == 2
+    assert stats["emotions"] == {"joy": 2}
+    storage.close()
+
+def test_totals_seeded_for_older_databases(tmp_path):
+    db_path = str(tmp_path / "data.db")
+    storage = SQLiteStorage(db_path)
+    for _ in range(3):
+        storage.add_image({"emotion": "joy"})
+    storage.add_job({"status": "processing"})
+    # Databases created before the running totals existed
+    storage._conn.execute("DROP TABLE collection_counts")
+    storage.close()
+    
+    storage = SQLiteStorage(db_path)
+    storage.add_image({"emotion": "joy"})
+    stats = storage.get_stats()
+    assert (stats["total_images"], stats["total_models"], stats["total_jobs"]) == (4, 0, 1)
+    storage.close()
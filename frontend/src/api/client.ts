@@ -26,8 +26,15 @@ export const curateImages = async (topN: number = 50) => {
 }
 
 // Gallery
-export const getTimeline = async () => {
-  const response = await api.get('/gallery/timeline')
+export const getTimeline = async (
+  cursor?: string,
+  limit: number = 200,
+  signal?: AbortSignal
+) => {
+  const response = await api.get('/gallery/timeline', {
+    params: { cursor, limit },
+    signal
+  })
   return response.data
 }
 
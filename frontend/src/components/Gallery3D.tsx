@@ -1,4 +1,5 @@
-import { useEffect, useState } from 'react'
+import { useCallback, useEffect, useRef, useState } from 'react'
+import axios from 'axios'
 import { getTimeline } from '../api/client'
 
 interface ImageData {
@@ -9,24 +10,73 @@ interface ImageData {
   timestamp: string
 }
 
+const PAGE_SIZE = 200
+
 export default function Gallery3D() {
-  const [images, setImages] = useState<ImageData[]>([])
+  // Pages are appended in place; pageCount triggers the re-render
+  const imagesRef = useRef<ImageData[]>([])
+  const [pageCount, setPageCount] = useState(0)
+  const [total, setTotal] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
+  const [hasMore, setHasMore] = useState(false)
 
-  useEffect(() => {
-    loadImages()
-  }, [])
+  const cursorRef = useRef<string | null>(null)
+  // Controller of the page request in flight (one at a time per mount)
+  const fetchingRef = useRef<AbortController | null>(null)
+  const abortRef = useRef<AbortController | null>(null)
+  const sentinelRef = useRef<HTMLDivElement | null>(null)
 
-  const loadImages = async () => {
+  const loadPage = useCallback(async () => {
+    const controller = abortRef.current
+    if (!controller || fetchingRef.current === controller) return
+    fetchingRef.current = controller
     try {
-      const response = await getTimeline()
-      setImages(response.timeline)
+      const response = await getTimeline(
+        cursorRef.current ?? undefined,
+        PAGE_SIZE,
+        controller.signal
+      )
+      if (controller.signal.aborted) return
+      if (response.total != null) setTotal(response.total)
+      imagesRef.current.push(...response.timeline)
+      cursorRef.current = response.next_cursor
+      setHasMore(Boolean(response.next_cursor))
+      setPageCount(count => count + 1)
     } catch (error) {
+      if (axios.isCancel(error)) return
       console.error('Error loading images:', error)
+      setHasMore(false)
     } finally {
-      setLoading(false)
+      if (fetchingRef.current === controller) fetchingRef.current = null
+      if (!controller.signal.aborted) setLoading(false)
     }
-  }
+  }, [])
+
+  // First page on mount; in-flight requests are cancelled on unmount
+  useEffect(() => {
+    abortRef.current = new AbortController()
+    imagesRef.current = []
+    cursorRef.current = null
+    loadPage()
+    return () => abortRef.current?.abort()
+  }, [loadPage])
+
+  // Next page only when the end of the album scrolls into view. Observed
+  // again after every page, so a sentinel still on screen keeps loading.
+  useEffect(() => {
+    const sentinel = sentinelRef.current
+    if (!hasMore || !sentinel) return
+    const observer = new IntersectionObserver(
+      entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadPage()
+      },
+      { rootMargin: '600px' }
+    )
+    observer.observe(sentinel)
+    return () => observer.disconnect()
+  }, [hasMore, pageCount, loadPage])
+
+  const images = imagesRef.current
 
   if (loading) {
     return (
@@ -80,7 +130,7 @@ export default function Gallery3D() {
           <div 
             key={img.id} 
             className="group relative animate-fade-in"
-            style={{ animationDelay: `${index * 0.1}s` }}
+            style={{ animationDelay: `${Math.min(index % PAGE_SIZE, 20) * 0.05}s` }}
           >
             {/* Vintage photo frame */}
             <div className="relative backdrop-blur-sm bg-gradient-to-br from-amber-50/90 to-orange-50/90 rounded-xl p-4 border-4 border-amber-700/50 hover:border-amber-600 transition-all duration-300 transform hover:scale-105 hover:rotate-1 hover:shadow-2xl">
@@ -124,13 +174,20 @@ export default function Gallery3D() {
           </div>
         ))}
       </div>
+
+      {/* Loads the next page when it comes into view */}
+      {hasMore && (
+        <div ref={sentinelRef} className="py-6 text-center">
+          <p className="text-amber-700/70 font-serif italic">Đang tải thêm ảnh...</p>
+        </div>
+      )}
       
       {/* Vintage Album Stats */}
       <div className="mt-8 text-center">
         <div className="inline-block backdrop-blur-sm bg-gradient-to-br from-amber-100/80 to-orange-100/80 rounded-xl px-8 py-4 border-4 border-amber-700/40 shadow-xl">
           <div className="flex items-center gap-6">
             <div className="text-center">
-              <p className="text-3xl font-serif font-bold text-amber-900">{images.length}</p>
+              <p className="text-3xl font-serif font-bold text-amber-900">{total ?? images.length}</p>
               <p className="text-sm font-serif text-amber-700/70 italic">Ảnh</p>
             </div>
             <div className="w-px h-12 bg-amber-700/30"></div>
@@ -40,6 +40,12 @@ export default function UploadSection() {
     try {
       const response = await uploadImages(files)
       setResults(response.results)
+      if (response.failed?.length) {
+        const names = response.failed.map((f: { filename: string; error: string }) =>
+          `${f.filename}: ${f.error}`
+        )
+        alert('⚠️ Không xử lý được:\n' + names.join('\n'))
+      }
     } catch (error) {
       alert('❌ Lỗi khi upload: ' + error)
     } finally {